@@ -1,10 +1,19 @@
 """The Energenie ENER314-RT integration."""
-import asyncio
 import logging
+import threading
+import time
+from contextlib import nullcontext
 
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EVENT_HOMEASSISTANT_STARTED
 from homeassistant.core import HomeAssistant, ServiceCall
+try:
+    from homeassistant.core import SupportsResponse
+except ImportError:  # Service responses need Home Assistant 2023.7 or later
+    SupportsResponse = None
 from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers import entity_registry as er
+import homeassistant.helpers.config_validation as cv
 import voluptuous as vol
 
 from .const import (
@@ -15,6 +24,9 @@ from .const import (
     SERVICE_TURN_OFF_ALL,
     SERVICE_PAIR_DEVICE,
     SERVICE_LEARN_MODE,
+    SERVICE_APPLY_SCENE,
+    SERVICE_START_PROFILE,
+    SWITCHABLE_DEVICE_TYPES,
     DEVICE_TYPE_LIGHT,
     DEVICE_TYPE_SWITCH,
     CONF_DEVICE_1_NAME,
@@ -25,11 +37,193 @@ from .const import (
     CONF_DEVICE_3_TYPE,
     CONF_DEVICE_4_NAME,
     CONF_DEVICE_4_TYPE,
+    DATA_CONFIG,
+    DATA_RADIO,
+    CONF_USE_LOCAL_RADIO,
+    CONF_TRACING,
+    DATA_PLATFORMS,
+    DATA_FORWARDED,
+    RELOAD_OPTIONS,
+    SWITCH_DEVICE_TYPES,
+    MAX_GROUPS,
+    CONF_MOTION_SENSOR_ENABLED,
+    CONF_DOOR_SENSOR_ENABLED,
+    CONF_POWER_MONITOR_ENABLED,
+    SEQUENCE_INTERVAL,
 )
+from .entity import forget_controller_device_info
+from .journal import JOURNAL_FILE, CommandJournal
+from .probe import (
+    PROBE_FILE,
+    PROBE_HARDWARE_FAILED,
+    PROBE_MISSING_ENERGENIE,
+    PROBE_MISSING_GPIO,
+    probe,
+)
+from .profiler import MAX_DURATION, PROFILE_FILE, profile
+from .radio import EnergenieRadio
+from .tracing import TRACE_FILE, EnergenieTracer, traced
 
 _LOGGER = logging.getLogger(__name__)
 
-PLATFORMS = ["light", "switch", "binary_sensor"]
+PLATFORMS = ["light", "switch", "binary_sensor", "sensor"]
+
+
+APPLY_SCENE_SCHEMA = vol.Schema({
+    vol.Required("devices"): {cv.string: cv.boolean},
+    vol.Optional("force", default=False): cv.boolean,
+})
+
+START_PROFILE_SCHEMA = vol.Schema({
+    vol.Optional("duration", default=60): vol.All(vol.Coerce(int), vol.Range(min=1, max=MAX_DURATION)),
+})
+
+
+def _resolve_scene(hass: HomeAssistant, entry: ConfigEntry, devices) -> dict:
+    """Map scene keys (device numbers or entity IDs) to device numbers.
+
+    Keys that do not name an enabled on/off device of this entry are
+    logged and left out.
+    """
+    registry = er.async_get(hass)
+    prefix = f"{DOMAIN}_{entry.entry_id}_"
+    targets = {}
+    for key, on in devices.items():
+        device_num = None
+        if key.strip().isdigit():
+            device_num = int(key)
+        else:
+            entity = registry.async_get(key)
+            if entity and entity.unique_id.startswith(prefix):
+                kind, _, number = entity.unique_id[len(prefix):].rpartition("_")
+                if kind in ("light", "switch") and number.isdigit():
+                    device_num = int(number)
+        if (
+            device_num is None
+            or not entry.data.get(f"device_{device_num}_enabled", False)
+            or entry.data.get(f"device_{device_num}_type") not in SWITCHABLE_DEVICE_TYPES
+        ):
+            _LOGGER.warning("Scene target %s is not an enabled Energenie device, skipping", key)
+            continue
+        targets[device_num] = on
+    return targets
+
+
+def _switchable_devices(config) -> list:
+    """Return the enabled on/off device numbers in config."""
+    return [
+        i for i in range(1, config.get("num_devices", 16) + 1)
+        if config.get(f"device_{i}_enabled", False)
+        and config.get(f"device_{i}_type") in SWITCHABLE_DEVICE_TYPES
+    ]
+
+
+def _wanted_platforms(config) -> list:
+    """Return the platforms config has entities for, in PLATFORMS order."""
+    device_types = {
+        config.get(f"device_{i}_type")
+        for i in range(1, config.get("num_devices", 16) + 1)
+        if config.get(f"device_{i}_enabled", False)
+    }
+    has_groups = any(config.get(f"group_{g}_enabled", False) for g in range(1, MAX_GROUPS + 1))
+    binary = config.get(CONF_MOTION_SENSOR_ENABLED, False) or config.get(CONF_DOOR_SENSOR_ENABLED, False)
+    power = config.get(CONF_POWER_MONITOR_ENABLED, False)
+
+    wanted = set()
+    if DEVICE_TYPE_LIGHT in device_types:
+        wanted.add("light")
+    if has_groups or device_types.intersection(SWITCH_DEVICE_TYPES):
+        wanted.add("switch")
+    if binary:
+        wanted.add("binary_sensor")
+    # The duplicates sensor only counts something while messages are received
+    if binary or power:
+        wanted.add("sensor")
+    return [platform for platform in PLATFORMS if platform in wanted]
+
+
+async def _async_forward_platforms(hass: HomeAssistant, entry: ConfigEntry, platforms) -> None:
+    """Set up platforms that have not been forwarded for the entry yet."""
+    forwarded = hass.data[DOMAIN][entry.entry_id][DATA_FORWARDED]
+    platforms = [platform for platform in platforms if platform not in forwarded]
+    if not platforms:
+        return
+    _LOGGER.info("Setting up platforms: %s", platforms)
+    forwarded.update(platforms)
+    # Newer Home Assistant versions expect late forwards to hold the setup lock
+    async with getattr(entry, "setup_lock", None) or nullcontext():
+        await hass.config_entries.async_forward_entry_setups(entry, platforms)
+
+
+def _journal_path(hass: HomeAssistant, entry: ConfigEntry) -> str:
+    """Return the path of the entry's command journal."""
+    return hass.config.path(".storage", JOURNAL_FILE.format(entry.entry_id))
+
+
+def _traced_service(radio: EnergenieRadio, service: str, handler):
+    """Wrap a service handler so each call starts a command trace."""
+    async def handle(call: ServiceCall):
+        with traced(radio.tracer, f"service.{service}"):
+            return await handler(call)
+
+    return handle
+
+
+def _delivery_response(call: ServiceCall, deliveries):
+    """Return the per-device results of a call, if the caller asked for them."""
+    if not getattr(call, "return_response", False):
+        return None
+    results = [deliveries[device_num].as_dict() for device_num in sorted(deliveries)]
+    return {
+        "devices": results,
+        "sent": sum(result["sent"] for result in results),
+        "failed": sum(not result["sent"] for result in results),
+    }
+
+
+def _probe_path(hass: HomeAssistant) -> str:
+    """Return the path of the stored hardware probe."""
+    return hass.config.path(".storage", PROBE_FILE)
+
+
+async def _async_test_local_radio(hass: HomeAssistant) -> bool:
+    """Test the libraries and hardware of the locally attached board.
+
+    The hardware is only tested when the stored probe is out of date.
+    Returns False when a required library is missing.
+    """
+    result = await hass.async_add_executor_job(probe, _probe_path(hass))
+
+    if result == PROBE_MISSING_GPIO:
+        # Create a persistent notification instead of failing
+        hass.components.persistent_notification.create(
+            message="Energenie integration requires RPi.GPIO library. Home Assistant is attempting to install it automatically. Please restart Home Assistant and try again. If the problem persists, check the logs for installation errors.",
+            title="Energenie: Missing RPi.GPIO",
+            notification_id="energenie_rpi_gpio_missing"
+        )
+        return False
+
+    if result == PROBE_MISSING_ENERGENIE:
+        # Create a persistent notification instead of failing
+        hass.components.persistent_notification.create(
+            message="Energenie integration requires pyenergenie library. Home Assistant is attempting to install it automatically. Please restart Home Assistant and try again. If the problem persists, check the logs for installation errors.",
+            title="Energenie: Missing pyenergenie",
+            notification_id="energenie_pyenergenie_missing"
+        )
+        return False
+
+    if result == PROBE_HARDWARE_FAILED:
+        # Don't fail setup for hardware test failures - allow software testing
+        _LOGGER.info("pyenergenie library is available, hardware test failed (continuing anyway)")
+        # Create an info notification about hardware
+        hass.components.persistent_notification.create(
+            message="Energenie integration loaded successfully, but hardware test failed. This is normal if your ENER314-RT board is not connected or powered. The integration will work when hardware is properly connected. The board is tested again on the first restart or reload after an hour, or straight away with \"Run hardware test\" in the integration options.",
+            title="Energenie: Hardware Test Warning",
+            notification_id="energenie_hardware_warning"
+        )
+
+    return True
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Energenie ENER314-RT from a config entry."""
@@ -40,53 +234,36 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     try:
         # Store configuration data
         hass.data.setdefault(DOMAIN, {})
-        hass.data[DOMAIN][entry.entry_id] = entry.data
+        hass.data[DOMAIN][entry.entry_id] = {
+            DATA_CONFIG: entry.data,
+            DATA_RADIO: EnergenieRadio(hass, entry.entry_id, entry.data),
+            DATA_PLATFORMS: {},
+            DATA_FORWARDED: set(),
+        }
         _LOGGER.debug("Configuration data stored successfully")
 
         # Test dependencies and functionality - with user-friendly error messages
-        _LOGGER.info("Testing required dependencies...")
-        
-        # Test RPi.GPIO
-        try:
-            import RPi.GPIO
-            _LOGGER.info("RPi.GPIO library found")
-        except ImportError as e:
-            _LOGGER.error("RPi.GPIO library not available: %s", e)
-            # Create a persistent notification instead of failing
-            hass.components.persistent_notification.create(
-                message="Energenie integration requires RPi.GPIO library. Home Assistant is attempting to install it automatically. Please restart Home Assistant and try again. If the problem persists, check the logs for installation errors.",
-                title="Energenie: Missing RPi.GPIO",
-                notification_id="energenie_rpi_gpio_missing"
-            )
-            return False
-        
-        # Test pyenergenie availability and functionality
-        try:
-            import energenie
-            # Test basic initialization to ensure library works
-            energenie.init()
-            _LOGGER.info("pyenergenie initialization successful")
-            energenie.finished()
-        except ImportError as e:
-            _LOGGER.error("pyenergenie library not available: %s", e)
-            # Create a persistent notification instead of failing
-            hass.components.persistent_notification.create(
-                message="Energenie integration requires pyenergenie library. Home Assistant is attempting to install it automatically. Please restart Home Assistant and try again. If the problem persists, check the logs for installation errors.",
-                title="Energenie: Missing pyenergenie",
-                notification_id="energenie_pyenergenie_missing"
-            )
-            return False
-        except Exception as e:
-            _LOGGER.warning("pyenergenie hardware test failed (this may be normal if hardware not connected): %s", e)
-            # Don't fail setup for hardware test failures - allow software testing
-            _LOGGER.info("pyenergenie library is available, hardware test failed (continuing anyway)")
-            # Create an info notification about hardware
-            hass.components.persistent_notification.create(
-                message="Energenie integration loaded successfully, but hardware test failed. This is normal if your ENER314-RT board is not connected or powered. The integration will work when hardware is properly connected.",
-                title="Energenie: Hardware Test Warning",
-                notification_id="energenie_hardware_warning"
+        # (only needed when a board is attached to this host rather than a bridge)
+        if entry.data.get(CONF_USE_LOCAL_RADIO, True):
+            if not await _async_test_local_radio(hass):
+                return False
+        else:
+            _LOGGER.info("Local radio disabled, sending through network bridges only")
+
+        radio = hass.data[DOMAIN][entry.entry_id][DATA_RADIO]
+
+        # Opt-in command tracing
+        if entry.data.get(CONF_TRACING, False):
+            radio.tracer = await hass.async_add_executor_job(
+                EnergenieTracer, hass.config.path(TRACE_FILE)
             )
 
+        # Restore the device states known from before the restart
+        await radio.async_load_journal(_journal_path(hass, entry))
+
+        # Encode the frames of every configured device once, up front
+        hass.async_create_task(radio.async_warm_frames(_switchable_devices(entry.data)))
+
         # Setup device registry
         device_registry = dr.async_get(hass)
         device_registry.async_get_or_create(
@@ -98,123 +275,195 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         )
         _LOGGER.debug("Device registry setup complete")
 
-        # Set up platforms
-        _LOGGER.info("Setting up platforms: %s", PLATFORMS)
-        await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+        # Set up only the platforms that have entities; the others are
+        # forwarded when the options flow adds something for them
+        platforms = _wanted_platforms(entry.data)
+        _LOGGER.info("Setting up platforms: %s", platforms)
+        hass.data[DOMAIN][entry.entry_id][DATA_FORWARDED].update(platforms)
+        await hass.config_entries.async_forward_entry_setups(entry, platforms)
         _LOGGER.debug("All platforms setup completed")
 
         # Register services
         _LOGGER.debug("Registering services")
-        async def handle_turn_on_all(call: ServiceCall) -> None:
+
+        async def handle_turn_on_all(call: ServiceCall):
             """Handle turn on all devices service."""
+            deliveries = {}
             try:
-                import energenie
-                energenie.init()
-                
                 # Get all configured devices from entry data
-                config_data = hass.data[DOMAIN][entry.entry_id]
+                config_data = hass.data[DOMAIN][entry.entry_id][DATA_CONFIG]
                 num_devices = config_data.get("num_devices", 16)
                 
-                for i in range(1, num_devices + 1):
-                    device_enabled_key = f"device_{i}_enabled"
-                    if config_data.get(device_enabled_key, False):
-                        energenie.switch_on(i)
-                        await asyncio.sleep(0.5)
+                commands = [
+                    (i, True) for i in range(1, num_devices + 1)
+                    if config_data.get(f"device_{i}_enabled", False)
+                ]
+                # Paced against the radio's deadline clock, not loop sleeps
+                reports = await radio.async_send_batch(
+                    commands, interval=SEQUENCE_INTERVAL, deliveries=deliveries
+                )
+                for report in reports:
+                    _LOGGER.debug("Turn on all pacing: %s", report)
                         
-                energenie.finished()
                 _LOGGER.info("All enabled Energenie devices turned on")
             except Exception as e:
                 _LOGGER.error("Error turning on all devices: %s", e)
+            return _delivery_response(call, deliveries)
 
-        async def handle_pair_device(call: ServiceCall) -> None:
+        async def handle_pair_device(call: ServiceCall):
             """Handle device pairing service."""
             device_id = call.data.get("device_id", 1)
             duration = call.data.get("duration", 10)
+            deliveries = {}
             
             try:
-                import energenie
-                energenie.init()
-                
                 _LOGGER.info("Starting pairing mode for device %d for %d seconds", device_id, duration)
                 _LOGGER.info("PUT YOUR ENERGENIE DEVICE INTO LEARN MODE NOW!")
                 
-                # Send repeated on/off signals to help device learn
-                for i in range(duration):
-                    energenie.switch_on(device_id)
-                    await asyncio.sleep(0.5)
-                    energenie.switch_off(device_id)
-                    await asyncio.sleep(0.5)
-                    _LOGGER.debug("Pairing signal %d/%d sent for device %d", i+1, duration, device_id)
+                # Send repeated on/off signals to help device learn, at exact intervals
+                report = await radio.async_send_sequence(
+                    device_id, [True, False] * duration, SEQUENCE_INTERVAL, deliveries
+                )
                 
-                energenie.finished()
-                _LOGGER.info("Pairing mode completed for device %d", device_id)
+                _LOGGER.info("Pairing mode completed for device %d (%s)", device_id, report)
                 
             except Exception as e:
                 _LOGGER.error("Error during device pairing: %s", e)
+            return _delivery_response(call, deliveries)
 
-        async def handle_learn_mode(call: ServiceCall) -> None:
+        async def handle_learn_mode(call: ServiceCall):
             """Handle learn mode service - sends continuous signals."""
             device_id = call.data.get("device_id", 1)
             command = call.data.get("command", "on")  # "on" or "off"
             duration = call.data.get("duration", 20)
+            deliveries = {}
             
             try:
-                import energenie
-                energenie.init()
-                
                 _LOGGER.info("Starting learn mode: device %d, command %s, duration %d seconds", device_id, command, duration)
                 _LOGGER.info("PUT YOUR ENERGENIE DEVICE INTO LEARN MODE NOW!")
                 
-                # Send repeated signals
-                for i in range(duration * 2):  # Send every 0.5 seconds
-                    if command == "on":
-                        energenie.switch_on(device_id)
-                    else:
-                        energenie.switch_off(device_id)
-                    await asyncio.sleep(0.5)
-                    _LOGGER.debug("Learn signal %d sent for device %d (%s)", i+1, device_id, command)
+                # Send repeated signals every 0.5 seconds, at exact intervals
+                report = await radio.async_send_sequence(
+                    device_id, [command == "on"] * int(duration / SEQUENCE_INTERVAL), SEQUENCE_INTERVAL,
+                    deliveries,
+                )
                 
-                energenie.finished()
-                _LOGGER.info("Learn mode completed for device %d", device_id)
+                _LOGGER.info("Learn mode completed for device %d (%s)", device_id, report)
                 
             except Exception as e:
                 _LOGGER.error("Error during learn mode: %s", e)
+            return _delivery_response(call, deliveries)
 
-        async def handle_turn_off_all(call: ServiceCall) -> None:
+        async def handle_turn_off_all(call: ServiceCall):
             """Handle turn off all devices service."""
+            deliveries = {}
             try:
-                import energenie
-                energenie.init()
-                
                 # Get all configured devices from entry data
-                config_data = hass.data[DOMAIN][entry.entry_id]
+                config_data = hass.data[DOMAIN][entry.entry_id][DATA_CONFIG]
                 num_devices = config_data.get("num_devices", 16)
                 
-                for i in range(1, num_devices + 1):
-                    device_enabled_key = f"device_{i}_enabled"
-                    if config_data.get(device_enabled_key, False):
-                        energenie.switch_off(i)
-                        await asyncio.sleep(0.5)
+                commands = [
+                    (i, False) for i in range(1, num_devices + 1)
+                    if config_data.get(f"device_{i}_enabled", False)
+                ]
+                # Paced against the radio's deadline clock, not loop sleeps
+                reports = await radio.async_send_batch(
+                    commands, interval=SEQUENCE_INTERVAL, deliveries=deliveries
+                )
+                for report in reports:
+                    _LOGGER.debug("Turn off all pacing: %s", report)
                         
-                energenie.finished()
                 _LOGGER.info("All enabled Energenie devices turned off")
             except Exception as e:
                 _LOGGER.error("Error turning off all devices: %s", e)
+            return _delivery_response(call, deliveries)
 
+        async def handle_apply_scene(call: ServiceCall) -> None:
+            """Handle apply scene service - sends only the devices that change."""
+            try:
+                targets = _resolve_scene(hass, entry, call.data["devices"])
+                known_states = radio.device_states
+                commands = [
+                    (device_num, on) for device_num, on in targets.items()
+                    if call.data["force"] or known_states.get(device_num) != on
+                ]
+                skipped = len(targets) - len(commands)
+                
+                if commands:
+                    await radio.async_send_batch(commands)
+                _LOGGER.info("Scene applied: %d device(s) sent, %d already in state", len(commands), skipped)
+            except Exception as e:
+                _LOGGER.error("Error applying scene: %s", e)
+
+        # Bulk and pairing services can return per-device delivery results
+        response = {"supports_response": SupportsResponse.OPTIONAL} if SupportsResponse else {}
+        hass.services.async_register(
+            DOMAIN, SERVICE_TURN_ON_ALL, _traced_service(radio, SERVICE_TURN_ON_ALL, handle_turn_on_all),
+            **response,
+        )
         hass.services.async_register(
-            DOMAIN, SERVICE_TURN_ON_ALL, handle_turn_on_all
+            DOMAIN, SERVICE_TURN_OFF_ALL, _traced_service(radio, SERVICE_TURN_OFF_ALL, handle_turn_off_all),
+            **response,
         )
         hass.services.async_register(
-            DOMAIN, SERVICE_TURN_OFF_ALL, handle_turn_off_all
+            DOMAIN, SERVICE_PAIR_DEVICE, _traced_service(radio, SERVICE_PAIR_DEVICE, handle_pair_device),
+            **response,
         )
         hass.services.async_register(
-            DOMAIN, SERVICE_PAIR_DEVICE, handle_pair_device
+            DOMAIN, SERVICE_LEARN_MODE, _traced_service(radio, SERVICE_LEARN_MODE, handle_learn_mode),
+            **response,
         )
+        async def handle_start_profile(call: ServiceCall) -> None:
+            """Handle start profile service - samples the radio and receive paths.
+
+            Returns at once; the profile runs in the background and
+            profile() logs the output path when it finishes.
+            """
+            duration = call.data["duration"]
+            path = hass.config.path(PROFILE_FILE.format(time.strftime("%Y%m%d-%H%M%S")))
+            _LOGGER.info("Profiling the Energenie integration for %d seconds", duration)
+
+            async def async_profile() -> None:
+                try:
+                    await hass.async_add_executor_job(profile, threading.get_ident(), duration, path)
+                except Exception as e:
+                    _LOGGER.error("Error profiling: %s", e)
+
+            # Background tasks are not waited for at shutdown (2023.4 or later)
+            create_task = getattr(hass, "async_create_background_task", None)
+            if create_task is not None:
+                create_task(async_profile(), "energenie_profile")
+            else:
+                hass.async_create_task(async_profile())
+
         hass.services.async_register(
-            DOMAIN, SERVICE_LEARN_MODE, handle_learn_mode
+            DOMAIN, SERVICE_APPLY_SCENE, _traced_service(radio, SERVICE_APPLY_SCENE, handle_apply_scene),
+            schema=APPLY_SCENE_SCHEMA,
+        )
+        hass.services.async_register(
+            DOMAIN, SERVICE_START_PROFILE, handle_start_profile, schema=START_PROFILE_SCHEMA
         )
         _LOGGER.debug("Services registered successfully")
 
+        # Re-command devices whose last command was never sent, once
+        # Home Assistant has started and interactive traffic has settled
+        async def async_reconcile(_event=None) -> None:
+            entry_data = hass.data[DOMAIN].get(entry.entry_id)
+            if entry_data is None or entry_data[DATA_RADIO] is not radio:
+                return  # Unloaded in the meantime
+            await radio.async_reconcile(_switchable_devices(entry_data[DATA_CONFIG]))
+
+        if hass.is_running:
+            hass.async_create_task(async_reconcile())
+        else:
+            hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STARTED, async_reconcile)
+
+        # Optional idle-time re-assertion and message events
+        radio.async_start()
+
+        # Apply option changes without restarting the radio
+        entry.async_on_unload(entry.add_update_listener(_async_update_listener))
+
         _LOGGER.info("Energenie integration setup completed successfully")
         return True
         
@@ -225,19 +474,65 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
-    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    entry_data = hass.data[DOMAIN].get(entry.entry_id, {})
+    unload_ok = await hass.config_entries.async_unload_platforms(
+        entry, [platform for platform in PLATFORMS if platform in entry_data.get(DATA_FORWARDED, ())]
+    )
 
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
+        entry_data = hass.data[DOMAIN].pop(entry.entry_id)
+        await entry_data[DATA_RADIO].async_stop()
+        forget_controller_device_info(entry.entry_id)
 
     # Remove services
     hass.services.async_remove(DOMAIN, SERVICE_TURN_ON_ALL)
     hass.services.async_remove(DOMAIN, SERVICE_TURN_OFF_ALL)
     hass.services.async_remove(DOMAIN, SERVICE_PAIR_DEVICE)
     hass.services.async_remove(DOMAIN, SERVICE_LEARN_MODE)
+    hass.services.async_remove(DOMAIN, SERVICE_APPLY_SCENE)
+    hass.services.async_remove(DOMAIN, SERVICE_START_PROFILE)
 
     return unload_ok
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Delete the command journal of a removed entry."""
+    journal = CommandJournal(_journal_path(hass, entry))
+    await hass.async_add_executor_job(journal.remove)
+
+
+async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply changed options as a diff of the entities.
+
+    New devices get entities, removed devices lose them and renamed ones
+    are updated in place; the radio, its receive loop and unchanged
+    entities keep running. Only radio level options need a full reload.
+    """
+    entry_data = hass.data[DOMAIN].get(entry.entry_id)
+    if entry_data is None:
+        return
+    old_config = entry_data[DATA_CONFIG]
+    if old_config == entry.data:
+        return
+
+    changed = [key for key in RELOAD_OPTIONS if old_config.get(key) != entry.data.get(key)]
+    if changed:
+        _LOGGER.info("Energenie radio options changed (%s), reloading", ", ".join(changed))
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+
+    _LOGGER.info("Applying Energenie configuration changes")
+    entry_data[DATA_CONFIG] = entry.data
+    radio = entry_data[DATA_RADIO]
+    radio.async_update_config(entry.data)
+    for platform in entry_data[DATA_PLATFORMS].values():
+        platform.async_apply(entry.data)
+    await _async_forward_platforms(hass, entry, _wanted_platforms(entry.data))
+
+    new_devices = set(_switchable_devices(entry.data)) - set(_switchable_devices(old_config))
+    if new_devices:
+        await radio.async_warm_frames(sorted(new_devices))
+
+
 async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Reload config entry."""
     await async_unload_entry(hass, entry)
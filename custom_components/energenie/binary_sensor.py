@@ -1,57 +1,105 @@
 """Binary sensor platform for Energenie ENER314-RT integration."""
 import logging
-import asyncio
 from datetime import timedelta
 
 from homeassistant.components.binary_sensor import BinarySensorEntity, BinarySensorDeviceClass
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.event import async_track_time_interval
 from homeassistant.util import dt as dt_util
 
 from .const import (
     DOMAIN,
-    MANUFACTURER,
-    MODEL,
     CONF_MOTION_SENSOR_ENABLED,
     CONF_MOTION_SENSOR_NAME,
     CONF_MOTION_SENSOR_ID,
     DEFAULT_MOTION_SENSOR_NAME,
     DEFAULT_MOTION_SENSOR_ID,
+    CONF_DOOR_SENSOR_ENABLED,
+    CONF_DOOR_SENSOR_NAME,
+    CONF_DOOR_SENSOR_ID,
+    DEFAULT_DOOR_SENSOR_NAME,
+    DEFAULT_DOOR_SENSOR_ID,
+    DATA_RADIO,
+    DATA_PLATFORMS,
 )
+from .entity import controller_device_info
+from .platform_sync import PlatformEntities
+from .receivers import RECEIVERS_BY_KIND, decode_report
 
 _LOGGER = logging.getLogger(__name__)
 
-SCAN_INTERVAL = timedelta(seconds=5)  # Check for messages every 5 seconds
+MOTION_CLEAR_DELAY = 30  # seconds without a motion message before motion clears
+
+# A sensor not heard from for this long is unavailable; motion and door
+# sensors only transmit when something happens, so this is much longer
+# than the Smart Plug+ timeout
+REPORT_TIMEOUT = timedelta(hours=12)
+
+# Receiver kind -> (enabled, name and default, sensor ID and default) options
+BINARY_SENSORS = {
+    "motion": (
+        CONF_MOTION_SENSOR_ENABLED, CONF_MOTION_SENSOR_NAME, DEFAULT_MOTION_SENSOR_NAME,
+        CONF_MOTION_SENSOR_ID, DEFAULT_MOTION_SENSOR_ID,
+    ),
+    "door": (
+        CONF_DOOR_SENSOR_ENABLED, CONF_DOOR_SENSOR_NAME, DEFAULT_DOOR_SENSOR_NAME,
+        CONF_DOOR_SENSOR_ID, DEFAULT_DOOR_SENSOR_ID,
+    ),
+}
 
 async def async_setup_entry(hass, config_entry, async_add_entities):
-    """Set up Energenie motion sensors from a config entry."""
+    """Set up Energenie motion and door sensors from a config entry."""
+    entry_data = hass.data[DOMAIN][config_entry.entry_id]
+    radio = entry_data[DATA_RADIO]
+
+    platform = PlatformEntities(
+        hass,
+        lambda config: _build_sensors(config, config_entry.entry_id, radio),
+        async_add_entities,
+    )
+    entry_data[DATA_PLATFORMS]["binary_sensor"] = platform
+    platform.async_apply(config_entry.data)
+
+
+def _build_sensors(config, config_entry_id, radio):
+    """Return the binary sensor entities config asks for, by unique ID."""
     sensors = []
-    
-    # Only create motion sensor if enabled
-    if config_entry.data.get(CONF_MOTION_SENSOR_ENABLED, False):
-        sensor_name = config_entry.data.get(CONF_MOTION_SENSOR_NAME, DEFAULT_MOTION_SENSOR_NAME)
-        sensor_id = config_entry.data.get(CONF_MOTION_SENSOR_ID, DEFAULT_MOTION_SENSOR_ID)
-        sensors.append(EnergenieMotionSensor(sensor_name, sensor_id, config_entry.entry_id))
+    for kind, (enabled, name_key, default_name, id_key, default_id) in BINARY_SENSORS.items():
+        if config.get(enabled, False):
+            sensors.append(SENSOR_CLASSES[kind](
+                config.get(name_key, default_name), config.get(id_key, default_id),
+                config_entry_id, radio,
+            ))
 
-    if sensors:
-        async_add_entities(sensors, True)
+    return {sensor.unique_id: sensor for sensor in sensors}
 
 
-class EnergenieMotionSensor(BinarySensorEntity):
-    """Representation of an Energenie motion sensor."""
+class EnergenieReceiverSensor(BinarySensorEntity):
+    """An Energenie sensor whose reports are decoded by its receiver.
 
-    def __init__(self, name, sensor_id, config_entry_id):
-        """Initialize the motion sensor."""
+    Subclasses name the receiver kind, the decoded field that holds their
+    state and the device class.
+    """
+
+    _kind = None
+    _field = None
+    _device_class = None
+
+    def __init__(self, name, sensor_id, config_entry_id, radio):
+        """Initialize the sensor."""
         self._name = name
         self._sensor_id = sensor_id
         self._config_entry_id = config_entry_id
+        self._attr_device_info = controller_device_info(config_entry_id)
+        self._radio = radio
+        self._receiver = RECEIVERS_BY_KIND[self._kind]
         self._is_on = False
         self._last_seen = None
-        self._unique_id = f"energenie_motion_{sensor_id}"
-        self._listening = False
-        self._unsub_timer = None
+        self._expired = False  # not heard from within REPORT_TIMEOUT
+        self._unique_id = f"energenie_{self._kind}_{sensor_id}"
+        self._unsub_listener = None
 
     @property
     def name(self):
@@ -65,23 +113,13 @@ class EnergenieMotionSensor(BinarySensorEntity):
 
     @property
     def is_on(self):
-        """Return true if motion is detected."""
+        """Return true if the sensor is triggered."""
         return self._is_on
 
     @property
     def device_class(self):
         """Return the device class."""
-        return BinarySensorDeviceClass.MOTION
-
-    @property
-    def device_info(self):
-        """Return device information."""
-        return {
-            "identifiers": {(DOMAIN, self._config_entry_id)},
-            "name": "Energenie ENER314-RT Controller",
-            "manufacturer": MANUFACTURER,
-            "model": MODEL,
-        }
+        return self._device_class
 
     @property
     def extra_state_attributes(self):
@@ -91,93 +129,120 @@ class EnergenieMotionSensor(BinarySensorEntity):
             "last_seen": self._last_seen,
         }
 
+    @callback
+    def async_update_from(self, other):
+        """Take over the name of a reconfigured sensor."""
+        if other._name != self._name:
+            self._name = other._name
+            if self.hass is not None:
+                self.async_write_ha_state()
+
+    @property
+    def available(self):
+        """Return False while the radio is down or the sensor has gone quiet."""
+        return self._radio.local_available and not self._expired
+
     async def async_added_to_hass(self):
-        """Start listening for motion sensor messages when added to hass."""
+        """Start listening for sensor messages when added to hass."""
         await super().async_added_to_hass()
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass, self._radio.availability_signal, self.async_write_ha_state
+            )
+        )
         await self._start_listening()
 
     async def async_will_remove_from_hass(self):
-        """Stop listening when removed."""
+        """Stop listening and drop the expiry timer when removed."""
         await self._stop_listening()
+        self._radio.timers.async_cancel((self._unique_id, "expire"))
 
     async def _start_listening(self):
-        """Start listening for motion sensor messages."""
-        if self._listening:
+        """Start listening for sensor messages."""
+        if self._unsub_listener:
             return
             
-        _LOGGER.info("Starting motion sensor listener for %s", self._sensor_id)
-        self._listening = True
-        
-        # Set up periodic checking for messages
-        self._unsub_timer = async_track_time_interval(
-            self.hass, self._check_for_messages, SCAN_INTERVAL
+        _LOGGER.info("Starting %s sensor listener for %s", self._kind, self._sensor_id)
+        self._unsub_listener = self._radio.async_add_listener(
+            self._sensor_id, self._handle_message
         )
 
     async def _stop_listening(self):
-        """Stop listening for motion sensor messages."""
-        if not self._listening:
+        """Stop listening for sensor messages."""
+        if not self._unsub_listener:
             return
             
-        _LOGGER.info("Stopping motion sensor listener for %s", self._sensor_id)
-        self._listening = False
-        
-        if self._unsub_timer:
-            self._unsub_timer()
-            self._unsub_timer = None
+        _LOGGER.info("Stopping %s sensor listener for %s", self._kind, self._sensor_id)
+        self._unsub_listener()
+        self._unsub_listener = None
 
     @callback
-    async def _check_for_messages(self, now=None):
-        """Check for incoming motion sensor messages."""
+    def _handle_message(self, msg):
+        """Handle a message received from the sensor."""
         try:
-            import energenie
-            
-            # Initialize energenie for receiving
-            energenie.init()
-            
-            # Check for any incoming messages
-            msg = energenie.receive()
-            if msg:
-                # Check if this message is from our motion sensor
-                if hasattr(msg, 'sensor_id') and str(msg.sensor_id) == str(self._sensor_id):
-                    await self._handle_motion_message(msg)
-                elif hasattr(msg, 'device_id') and str(msg.device_id) == str(self._sensor_id):
-                    await self._handle_motion_message(msg)
-                    
-            energenie.finished()
-            
-        except Exception as e:
-            _LOGGER.error("Error checking for motion sensor messages: %s", e)
+            _LOGGER.debug("Received %s sensor message: %s", self._kind, msg)
+            receiver, values = decode_report(msg, self._receiver)
+            if receiver is not self._receiver:
+                _LOGGER.debug(
+                    "Ignoring report from %s: not a %s sensor", self._sensor_id, self._kind
+                )
+                return
 
-    async def _handle_motion_message(self, msg):
-        """Handle a motion sensor message."""
-        try:
-            _LOGGER.debug("Received motion sensor message: %s", msg)
-            
-            # Update last seen time
+            # Update last seen time and restart the expiry timer
             self._last_seen = dt_util.utcnow().isoformat()
-            
-            # Check if this is a motion detection message
-            motion_detected = False
-            
-            if hasattr(msg, 'motion') and msg.motion:
-                motion_detected = True
-            elif hasattr(msg, 'switch') and msg.switch:
-                motion_detected = True
-            elif hasattr(msg, 'state') and msg.state:
-                motion_detected = True
-                
-            # Update state if changed
-            if motion_detected != self._is_on:
-                self._is_on = motion_detected
-                self.async_write_ha_state()
-                _LOGGER.info("Motion sensor %s: %s", self._sensor_id, "detected" if motion_detected else "cleared")
-                
-            # Auto-clear motion after 30 seconds if no new messages
-            if motion_detected:
-                self.hass.loop.call_later(30, self._auto_clear_motion)
-                
+            self._radio.timers.async_schedule(
+                (self._unique_id, "expire"), REPORT_TIMEOUT.total_seconds(), self._async_expire
+            )
+
+            state = values.get(self._field)
+            if self._expired:
+                self._expired = False
+                if state is None or state == self._is_on:
+                    self.async_write_ha_state()
+            if state is not None:
+                self._async_handle_state(state)
+
         except Exception as e:
-            _LOGGER.error("Error handling motion sensor message: %s", e)
+            _LOGGER.error("Error handling %s sensor message: %s", self._kind, e)
+
+    @callback
+    def _async_expire(self):
+        """Mark the sensor unavailable when its reports stop."""
+        _LOGGER.warning("No report from %s sensor %s for %s", self._kind, self._sensor_id, REPORT_TIMEOUT)
+        self._expired = True
+        self.async_write_ha_state()
+
+    @callback
+    def _async_handle_state(self, state):
+        """Write a reported state if it changed."""
+        if state != self._is_on:
+            self._is_on = state
+            self.async_write_ha_state()
+            _LOGGER.info("%s sensor %s: %s", self._kind.capitalize(), self._sensor_id, "on" if state else "off")
+
+
+class EnergenieMotionSensor(EnergenieReceiverSensor):
+    """Representation of an Energenie motion sensor."""
+
+    _kind = "motion"
+    _field = "motion"
+    _device_class = BinarySensorDeviceClass.MOTION
+
+    async def async_will_remove_from_hass(self):
+        """Stop listening and drop the auto-clear timer when removed."""
+        await super().async_will_remove_from_hass()
+        self._radio.timers.async_cancel((self._unique_id, "clear"))
+
+    @callback
+    def _async_handle_state(self, state):
+        """Write the motion state and restart the auto-clear timer."""
+        super()._async_handle_state(state)
+        # Auto-clear motion after 30 seconds if no new messages; a new
+        # message moves the existing timer instead of adding another
+        if state:
+            self._radio.timers.async_schedule(
+                (self._unique_id, "clear"), MOTION_CLEAR_DELAY, self._auto_clear_motion
+            )
 
     @callback
     def _auto_clear_motion(self):
@@ -185,4 +250,19 @@ class EnergenieMotionSensor(BinarySensorEntity):
         if self._is_on:
             self._is_on = False
             self.async_write_ha_state()
-            _LOGGER.debug("Auto-cleared motion for sensor %s", self._sensor_id)
\ No newline at end of file
+            _LOGGER.debug("Auto-cleared motion for sensor %s", self._sensor_id)
+
+
+class EnergenieDoorSensor(EnergenieReceiverSensor):
+    """Representation of an Energenie MIHO012 door/window sensor."""
+
+    _kind = "door"
+    _field = "open"
+    _device_class = BinarySensorDeviceClass.DOOR
+
+
+# Receiver kind -> entity class
+SENSOR_CLASSES = {
+    "motion": EnergenieMotionSensor,
+    "door": EnergenieDoorSensor,
+}
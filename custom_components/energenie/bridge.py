@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""Network bridge for sharing ENER314-RT radios between hosts.
+
+The protocol is newline-delimited JSON over TCP. Every request carries an
+"id" which is echoed in its response, so a client can pipeline several
+requests on one connection without waiting for each answer:
+
+    -> {"id": 1, "op": "switch", "device": 3, "state": true}
+    <- {"id": 1, "ok": true, "elapsed": 0.012}
+    -> {"id": 2, "op": "ping"}
+    <- {"id": 2, "ok": true, "elapsed": 0.0}
+    -> {"id": 3, "op": "batch", "commands": [[1, true], [2, true]], "interval": 0.05}
+    <- {"id": 3, "ok": true, "elapsed": 0.061, "pacing": {"frames": 2, ...}}
+
+Batch frames are paced against a deadline clock and the response reports
+the achieved jitter.
+
+The server listens on localhost unless told otherwise. Listening on any
+other address needs a shared token, and clients then have to send it
+before any other request on a connection:
+
+    -> {"id": 1, "op": "auth", "token": "..."}
+    <- {"id": 1, "ok": true, "elapsed": 0.0}
+
+This module has no Home Assistant dependencies so the reference server can
+run on any Pi with an ENER314-RT board:
+
+    ENERGENIE_BRIDGE_TOKEN=... python3 bridge.py --host 0.0.0.0 --port 8765
+    python3 bridge.py --simulate  (no hardware, for testing on localhost)
+"""
+import argparse
+import asyncio
+import hmac
+import ipaddress
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from .frames import FrameCache
+    from .pacing import run_paced
+except ImportError:  # Run as a script next to frames.py
+    from frames import FrameCache
+    from pacing import run_paced
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_BRIDGE_PORT = 8765
+DEFAULT_BRIDGE_HOST = "127.0.0.1"
+TOKEN_ENV = "ENERGENIE_BRIDGE_TOKEN"  # where main() reads the token from by default
+REQUEST_TIMEOUT = 10.0  # seconds to wait for a bridge to answer a request
+MAX_LINE_LENGTH = 64 * 1024
+
+
+def parse_bridges(value):
+    """Parse "host[:port], host[:port]" into a list of (host, port) tuples."""
+    bridges = []
+    for item in (value or "").replace(";", ",").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.rpartition(":")
+        if host and port.isdigit():
+            bridges.append((host, int(port)))
+        else:
+            bridges.append((item, DEFAULT_BRIDGE_PORT))
+    return bridges
+
+
+def is_local_address(host):
+    """Return True if host only accepts connections from this machine."""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False  # A hostname may resolve to any interface
+
+
+class SimulatedRadio:
+    """Stand-in for the pyenergenie module when no board is attached."""
+
+    def __init__(self):
+        """Initialize the simulated radio."""
+        self.states = {}
+        self.frames_sent = 0
+
+    def init(self):
+        """Pretend to initialise the radio."""
+
+    def finished(self):
+        """Pretend to release the radio."""
+
+    def switch_on(self, device_num):
+        """Record an on frame."""
+        self.states[device_num] = True
+        self.frames_sent += 1
+
+    def switch_off(self, device_num):
+        """Record an off frame."""
+        self.states[device_num] = False
+        self.frames_sent += 1
+
+    def receive(self):
+        """Nothing is ever received."""
+        return None
+
+
+class BridgeServer:
+    """Serves the local radio to remote Energenie integrations."""
+
+    def __init__(self, radio, host=DEFAULT_BRIDGE_HOST, port=DEFAULT_BRIDGE_PORT, token=None):
+        """Initialize the server around a pyenergenie compatible radio.
+
+        Raises ValueError when asked to listen on a non-local address
+        without a token.
+        """
+        if not token and not is_local_address(host):
+            raise ValueError(f"A token is required to listen on {host}")
+        self._radio = radio
+        self._host = host
+        self._port = port
+        self._token = token or None
+        self._server = None
+        # The simulated radio has no encoder, so it never uses the cache
+        self._frames = FrameCache() if not isinstance(radio, SimulatedRadio) else None
+        # pyenergenie is not thread safe, so every radio call uses one thread
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="energenie_bridge")
+
+    @property
+    def port(self):
+        """Return the port the server is listening on."""
+        if self._server and self._server.sockets:
+            return self._server.sockets[0].getsockname()[1]
+        return self._port
+
+    async def start(self):
+        """Initialise the radio and start accepting connections."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._radio.init)
+        self._server = await asyncio.start_server(
+            self._handle_client, self._host, self._port, limit=MAX_LINE_LENGTH
+        )
+        _LOGGER.info("Energenie bridge listening on %s:%d", self._host, self.port)
+
+    async def stop(self):
+        """Stop the server and release the radio."""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._radio.finished)
+        self._executor.shutdown(wait=False)
+
+    async def _handle_client(self, reader, writer):
+        """Answer the requests of one client, in the order they arrive."""
+        peer = writer.get_extra_info("peername")
+        _LOGGER.info("Bridge client connected: %s", peer)
+        session = {"authenticated": self._token is None}
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                response = await self._handle_request(line, session)
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+                if session.get("rejected"):
+                    _LOGGER.warning("Bridge client %s rejected: no valid token", peer)
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            _LOGGER.debug("Bridge client %s dropped: %s", peer, e)
+        finally:
+            writer.close()
+            _LOGGER.info("Bridge client disconnected: %s", peer)
+
+    def _run_batch(self, commands, interval):
+        """Send a burst of frames, interval seconds apart (runs on the radio thread).
+
+        Returns the achieved PacingReport.
+        """
+        direct = self._frames is not None and self._frames.available
+        if direct:
+            self._frames.prepare_radio()
+
+        def send(device_num, on):
+            if direct:
+                self._frames.transmit(device_num, on)
+            elif on:
+                self._radio.switch_on(device_num)
+            else:
+                self._radio.switch_off(device_num)
+
+        return run_paced(commands, interval, send)
+
+    async def _handle_request(self, line, session):
+        """Execute one request line and return its response.
+
+        session holds the connection's authentication state.
+        """
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return {"id": None, "ok": False, "error": f"Invalid request: {e}"}
+
+        request_id = request.get("id")
+        start = time.monotonic()
+        extra = {}
+        try:
+            op = request.get("op")
+            if op == "auth":
+                if self._token is not None and not hmac.compare_digest(
+                    str(request.get("token", "")).encode(), self._token.encode()
+                ):
+                    session["rejected"] = True
+                    raise PermissionError("Invalid token")
+                session["authenticated"] = True
+            elif not session["authenticated"]:
+                session["rejected"] = True
+                raise PermissionError("Not authenticated")
+            elif op == "ping":
+                pass
+            elif op == "switch":
+                commands = [(int(request["device"]), bool(request.get("state")))]
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(self._executor, self._run_batch, commands, 0)
+            elif op == "batch":
+                commands = [(int(device), bool(state)) for device, state in request["commands"]]
+                interval = float(request.get("interval", 0))
+                loop = asyncio.get_running_loop()
+                report = await loop.run_in_executor(self._executor, self._run_batch, commands, interval)
+                extra["pacing"] = report.to_dict()
+            else:
+                raise ValueError(f"Unknown op {op!r}")
+        except Exception as e:
+            return {"id": request_id, "ok": False, "error": str(e)}
+        return {"id": request_id, "ok": True, "elapsed": round(time.monotonic() - start, 6), **extra}
+
+
+class BridgeError(Exception):
+    """A bridge rejected a request."""
+
+
+class BridgeClient:
+    """Pipelined client connection to one bridge server."""
+
+    def __init__(self, host, port=DEFAULT_BRIDGE_PORT, timeout=REQUEST_TIMEOUT, token=None):
+        """Initialize the client; the connection is opened on first use."""
+        self.host = host
+        self.port = port
+        self._timeout = timeout
+        self._token = token or None
+        self._reader = None
+        self._writer = None
+        self._read_task = None
+        self._connect_lock = asyncio.Lock()
+        self._pending = {}
+        self._next_id = 0
+
+    @property
+    def address(self):
+        """Return the bridge address as host:port."""
+        return f"{self.host}:{self.port}"
+
+    @property
+    def connected(self):
+        """Return True while the connection is open."""
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def _ensure_connected(self):
+        """Open the connection if it is not already open."""
+        async with self._connect_lock:
+            if self.connected:
+                return
+            self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port, limit=MAX_LINE_LENGTH),
+                self._timeout,
+            )
+            self._read_task = asyncio.ensure_future(self._read_responses())
+            if self._token is not None:
+                try:
+                    await self._send("auth", self._timeout, {"token": self._token})
+                except Exception:
+                    await self.close()
+                    raise
+            _LOGGER.info("Connected to Energenie bridge %s", self.address)
+
+    async def _read_responses(self):
+        """Resolve pending requests as their responses arrive."""
+        error = ConnectionError(f"Connection to bridge {self.address} closed")
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                response = json.loads(line)
+                future = self._pending.pop(response.get("id"), None)
+                if future and not future.done():
+                    future.set_result(response)
+        except (ConnectionError, ValueError) as e:
+            error = ConnectionError(f"Bridge {self.address} failed: {e}")
+        finally:
+            self._fail_pending(error)
+            if self._writer:
+                self._writer.close()
+            self._writer = None
+
+    def _fail_pending(self, error):
+        """Fail every request still waiting for a response."""
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
+
+    async def request(self, op, timeout=None, **params):
+        """Send a request and return its response.
+
+        Requests are written as soon as they are made, so concurrent
+        callers share the connection without waiting for each other.
+        timeout overrides the client's timeout for long requests.
+        """
+        await self._ensure_connected()
+        return await self._send(op, timeout or self._timeout, params)
+
+    async def _send(self, op, timeout, params):
+        """Write a request on the open connection and wait for its response."""
+        self._next_id += 1
+        request_id = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+
+        self._writer.write(json.dumps({"id": request_id, "op": op, **params}).encode() + b"\n")
+        try:
+            await self._writer.drain()
+            response = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self._pending.pop(request_id, None)
+            raise ConnectionError(f"Bridge {self.address} did not answer in {timeout}s")
+        finally:
+            self._pending.pop(request_id, None)
+
+        if not response.get("ok"):
+            raise BridgeError(response.get("error", "unknown error"))
+        return response
+
+    async def switch(self, device_num, on):
+        """Ask the bridge to switch a device."""
+        return await self.request("switch", device=device_num, state=bool(on))
+
+    async def batch(self, commands, interval=0):
+        """Ask the bridge to send a burst of (device, on) frames."""
+        return await self.request(
+            "batch",
+            # A long paced sequence takes a while before the bridge answers
+            timeout=self._timeout + len(commands) * interval,
+            commands=[[device_num, bool(on)] for device_num, on in commands],
+            interval=interval,
+        )
+
+    async def close(self):
+        """Close the connection."""
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+        if self._read_task:
+            self._read_task.cancel()
+            self._read_task = None
+        self._fail_pending(ConnectionError(f"Bridge {self.address} closed"))
+
+
+def main():
+    """Run the reference bridge server."""
+    parser = argparse.ArgumentParser(description="Share a local ENER314-RT radio over TCP")
+    parser.add_argument("--host", default=DEFAULT_BRIDGE_HOST, help="Address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_BRIDGE_PORT, help="Port to listen on")
+    parser.add_argument("--token", default=os.environ.get(TOKEN_ENV),
+                        help=f"Shared token clients must send, required unless listening on "
+                             f"localhost (default: ${TOKEN_ENV})")
+    parser.add_argument("--simulate", action="store_true",
+                        help="Use a simulated radio instead of the ENER314-RT board")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Enable debug logging")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+    if not args.token and not is_local_address(args.host):
+        parser.error(f"listening on {args.host} needs --token or ${TOKEN_ENV}")
+    if args.simulate:
+        radio = SimulatedRadio()
+    else:
+        import energenie as radio
+
+    async def serve():
+        server = BridgeServer(radio, args.host, args.port, args.token)
+        await server.start()
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.stop()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -26,7 +26,34 @@ from .const import (
     DEFAULT_DEVICE_NAMES,
     DEFAULT_MOTION_SENSOR_NAME,
     DEFAULT_MOTION_SENSOR_ID,
+    CONF_DOOR_SENSOR_ENABLED,
+    CONF_DOOR_SENSOR_NAME,
+    CONF_DOOR_SENSOR_ID,
+    DEFAULT_DOOR_SENSOR_NAME,
+    DEFAULT_DOOR_SENSOR_ID,
+    CONF_POWER_MONITOR_ENABLED,
+    CONF_POWER_MONITOR_NAME,
+    CONF_POWER_MONITOR_ID,
+    DEFAULT_POWER_MONITOR_NAME,
+    DEFAULT_POWER_MONITOR_ID,
+    CONF_BRIDGES,
+    CONF_BRIDGE_TOKEN,
+    CONF_USE_LOCAL_RADIO,
+    ROUTE_LOCAL,
+    MAX_GROUPS,
+    CONF_TRACING,
+    CONF_REASSERT_INTERVAL,
+    CONF_AIRTIME_BUDGET,
+    DEFAULT_REASSERT_INTERVAL,
+    DEFAULT_AIRTIME_BUDGET,
+    RELOAD_OPTIONS,
+    CONF_GROUP_BROADCAST,
+    parse_device_list,
+    CONF_MESSAGE_EVENTS,
+    CONF_EVENT_SENSOR_IDS,
+    CONF_EVENT_MESSAGE_TYPES,
 )
+from .probe import PROBE_FILE, PROBE_MISSING_ENERGENIE, PROBE_MISSING_GPIO, forget, probe
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -61,29 +88,21 @@ class EnergenieConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     setup_data[CONF_MOTION_SENSOR_NAME] = user_input.get(CONF_MOTION_SENSOR_NAME, DEFAULT_MOTION_SENSOR_NAME)
                     setup_data[CONF_MOTION_SENSOR_ID] = user_input.get(CONF_MOTION_SENSOR_ID, DEFAULT_MOTION_SENSOR_ID)
                 
-                # Test required dependencies - but allow setup to continue
-                dependencies_missing = []
+                # Door/window sensor setup
+                if user_input.get(CONF_DOOR_SENSOR_ENABLED, False):
+                    setup_data[CONF_DOOR_SENSOR_ENABLED] = True
+                    setup_data[CONF_DOOR_SENSOR_NAME] = user_input.get(CONF_DOOR_SENSOR_NAME, DEFAULT_DOOR_SENSOR_NAME)
+                    setup_data[CONF_DOOR_SENSOR_ID] = user_input.get(CONF_DOOR_SENSOR_ID, DEFAULT_DOOR_SENSOR_ID)
                 
-                # Test RPi.GPIO (but don't fail setup)
-                try:
-                    import RPi.GPIO
-                    _LOGGER.info("RPi.GPIO library found and imported successfully")
-                except ImportError as e:
-                    _LOGGER.warning("RPi.GPIO library not available: %s", e)
-                    dependencies_missing.append("RPi.GPIO")
-                
-                # Test pyenergenie availability (but don't fail setup)
-                try:
-                    _LOGGER.info("Testing pyenergenie library availability...")
-                    import energenie
-                    _LOGGER.info("pyenergenie library found and imported successfully")
-                    
-                except ImportError as e:
-                    _LOGGER.warning("pyenergenie library not available: %s", e)
-                    dependencies_missing.append("pyenergenie")
-                    
-                except Exception as e:
-                    _LOGGER.warning("pyenergenie library test warning: %s", e)
+                # Test required dependencies - but allow setup to continue.
+                # The result is stored, so setup right after reuses it
+                result = await self.hass.async_add_executor_job(
+                    probe, self.hass.config.path(".storage", PROBE_FILE)
+                )
+                dependencies_missing = {
+                    PROBE_MISSING_GPIO: ["RPi.GPIO"],
+                    PROBE_MISSING_ENERGENIE: ["pyenergenie"],
+                }.get(result, [])
                 
                 # Log missing dependencies but allow setup to continue
                 if dependencies_missing:
@@ -108,6 +127,9 @@ class EnergenieConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             vol.Optional(CONF_MOTION_SENSOR_ENABLED, default=False): bool,
             vol.Optional(CONF_MOTION_SENSOR_NAME, default=DEFAULT_MOTION_SENSOR_NAME): str,
             vol.Optional(CONF_MOTION_SENSOR_ID, default=DEFAULT_MOTION_SENSOR_ID): str,
+            vol.Optional(CONF_DOOR_SENSOR_ENABLED, default=False): bool,
+            vol.Optional(CONF_DOOR_SENSOR_NAME, default=DEFAULT_DOOR_SENSOR_NAME): str,
+            vol.Optional(CONF_DOOR_SENSOR_ID, default=DEFAULT_DOOR_SENSOR_ID): str,
         })
 
         return self.async_show_form(
@@ -167,6 +189,51 @@ class EnergenieOptionsFlow(config_entries.OptionsFlow):
                 new_data[f"device_{device_id}_enabled"] = True
                 new_data[f"device_{device_id}_name"] = device_name
                 new_data[f"device_{device_id}_type"] = device_type
+                new_data[f"device_{device_id}_bridge"] = user_input.get("new_device_bridge", ROUTE_LOCAL).strip() or ROUTE_LOCAL
+            
+            # Disable a device (0 = none)
+            remove_device_id = user_input.get("remove_device", 0)
+            if remove_device_id:
+                new_data[f"device_{remove_device_id}_enabled"] = False
+            
+            # Add a device group switched by one bulk transmission
+            if user_input.get("add_group"):
+                group_devices = parse_device_list(user_input.get("group_devices", ""))
+                group_num = next(
+                    (g for g in range(1, MAX_GROUPS + 1) if not new_data.get(f"group_{g}_enabled", False)),
+                    None,
+                )
+                if group_devices and group_num is not None:
+                    new_data[f"group_{group_num}_enabled"] = True
+                    new_data[f"group_{group_num}_name"] = user_input.get("group_name") or f"Energenie Group {group_num}"
+                    new_data[f"group_{group_num}_devices"] = ",".join(str(i) for i in group_devices)
+                    new_data[CONF_GROUP_BROADCAST.format(group_num)] = user_input.get("group_broadcast", False)
+                else:
+                    _LOGGER.warning("Not adding group: no valid devices or all %d group slots used", MAX_GROUPS)
+            
+            # Network bridges and whether this host has its own board
+            if CONF_BRIDGES in user_input:
+                new_data[CONF_BRIDGES] = user_input[CONF_BRIDGES].strip()
+            if CONF_BRIDGE_TOKEN in user_input:
+                new_data[CONF_BRIDGE_TOKEN] = user_input[CONF_BRIDGE_TOKEN].strip()
+            if CONF_USE_LOCAL_RADIO in user_input:
+                new_data[CONF_USE_LOCAL_RADIO] = user_input[CONF_USE_LOCAL_RADIO]
+            
+            # Command tracing for diagnosing slow commands
+            if CONF_TRACING in user_input:
+                new_data[CONF_TRACING] = user_input[CONF_TRACING]
+            
+            # Idle-time re-assertion of desired states
+            if CONF_REASSERT_INTERVAL in user_input:
+                new_data[CONF_REASSERT_INTERVAL] = user_input[CONF_REASSERT_INTERVAL]
+            if CONF_AIRTIME_BUDGET in user_input:
+                new_data[CONF_AIRTIME_BUDGET] = user_input[CONF_AIRTIME_BUDGET]
+            
+            # energenie_message events and their filters
+            for key in (CONF_MESSAGE_EVENTS, CONF_EVENT_SENSOR_IDS, CONF_EVENT_MESSAGE_TYPES):
+                if key in user_input:
+                    value = user_input[key]
+                    new_data[key] = value.strip() if isinstance(value, str) else value
             
             # Update motion sensor if changed
             if "motion_sensor_enabled" in user_input:
@@ -175,10 +242,39 @@ class EnergenieOptionsFlow(config_entries.OptionsFlow):
                     new_data[CONF_MOTION_SENSOR_NAME] = user_input.get("motion_sensor_name", DEFAULT_MOTION_SENSOR_NAME)
                     new_data[CONF_MOTION_SENSOR_ID] = user_input.get("motion_sensor_id", DEFAULT_MOTION_SENSOR_ID)
             
+            # Update door/window sensor if changed
+            if "door_sensor_enabled" in user_input:
+                new_data[CONF_DOOR_SENSOR_ENABLED] = user_input["door_sensor_enabled"]
+                if user_input["door_sensor_enabled"]:
+                    new_data[CONF_DOOR_SENSOR_NAME] = user_input.get("door_sensor_name", DEFAULT_DOOR_SENSOR_NAME)
+                    new_data[CONF_DOOR_SENSOR_ID] = user_input.get("door_sensor_id", DEFAULT_DOOR_SENSOR_ID)
+            
+            # Update Smart Plug+ power monitoring if changed
+            if "power_monitor_enabled" in user_input:
+                new_data[CONF_POWER_MONITOR_ENABLED] = user_input["power_monitor_enabled"]
+                if user_input["power_monitor_enabled"]:
+                    new_data[CONF_POWER_MONITOR_NAME] = user_input.get("power_monitor_name", DEFAULT_POWER_MONITOR_NAME)
+                    new_data[CONF_POWER_MONITOR_ID] = user_input.get("power_monitor_id", DEFAULT_POWER_MONITOR_ID)
+            
+            # Forget the stored hardware probe so the board is tested again;
+            # reload for it unless the radio options already cause a reload
+            reload_for_test = False
+            if user_input.get("run_hardware_test"):
+                await self.hass.async_add_executor_job(
+                    forget, self.hass.config.path(".storage", PROBE_FILE)
+                )
+                reload_for_test = all(
+                    new_data.get(key) == self.config_entry.data.get(key) for key in RELOAD_OPTIONS
+                )
+            
             # Update the config entry
             self.hass.config_entries.async_update_entry(
                 self.config_entry, data=new_data
             )
+            if reload_for_test:
+                self.hass.async_create_task(
+                    self.hass.config_entries.async_reload(self.config_entry.entry_id)
+                )
             
             return self.async_create_entry(title="", data={})
 
@@ -197,6 +293,14 @@ class EnergenieOptionsFlow(config_entries.OptionsFlow):
             vol.Optional("new_device_id", default=next_device_id): vol.In(list(range(1, 17))),
             vol.Optional("new_device_name", default=f"Energenie Device {next_device_id}"): str,
             vol.Optional("new_device_type", default=DEVICE_TYPE_LIGHT): vol.In(DEVICE_TYPES),
+            vol.Optional("new_device_bridge", default=ROUTE_LOCAL): str,
+            vol.Optional("remove_device", default=0): vol.In(
+                [0] + [i for i in range(1, 17) if current_config.get(f"device_{i}_enabled", False)]
+            ),
+            vol.Optional("add_group", default=False): bool,
+            vol.Optional("group_name", default="Energenie Group"): str,
+            vol.Optional("group_devices", default=""): str,
+            vol.Optional("group_broadcast", default=False): bool,
             vol.Optional(
                 "motion_sensor_enabled", 
                 default=current_config.get(CONF_MOTION_SENSOR_ENABLED, False)
@@ -209,6 +313,67 @@ class EnergenieOptionsFlow(config_entries.OptionsFlow):
                 "motion_sensor_id", 
                 default=current_config.get(CONF_MOTION_SENSOR_ID, DEFAULT_MOTION_SENSOR_ID)
             ): str,
+            vol.Optional(
+                "door_sensor_enabled", 
+                default=current_config.get(CONF_DOOR_SENSOR_ENABLED, False)
+            ): bool,
+            vol.Optional(
+                "door_sensor_name", 
+                default=current_config.get(CONF_DOOR_SENSOR_NAME, DEFAULT_DOOR_SENSOR_NAME)
+            ): str,
+            vol.Optional(
+                "door_sensor_id", 
+                default=current_config.get(CONF_DOOR_SENSOR_ID, DEFAULT_DOOR_SENSOR_ID)
+            ): str,
+            vol.Optional(
+                "power_monitor_enabled", 
+                default=current_config.get(CONF_POWER_MONITOR_ENABLED, False)
+            ): bool,
+            vol.Optional(
+                "power_monitor_name", 
+                default=current_config.get(CONF_POWER_MONITOR_NAME, DEFAULT_POWER_MONITOR_NAME)
+            ): str,
+            vol.Optional(
+                "power_monitor_id", 
+                default=current_config.get(CONF_POWER_MONITOR_ID, DEFAULT_POWER_MONITOR_ID)
+            ): str,
+            vol.Optional(
+                CONF_USE_LOCAL_RADIO, 
+                default=current_config.get(CONF_USE_LOCAL_RADIO, True)
+            ): bool,
+            vol.Optional(
+                CONF_BRIDGES, 
+                default=current_config.get(CONF_BRIDGES, "")
+            ): str,
+            vol.Optional(
+                CONF_BRIDGE_TOKEN, 
+                default=current_config.get(CONF_BRIDGE_TOKEN, "")
+            ): str,
+            vol.Optional(
+                CONF_TRACING, 
+                default=current_config.get(CONF_TRACING, False)
+            ): bool,
+            vol.Optional(
+                CONF_REASSERT_INTERVAL, 
+                default=current_config.get(CONF_REASSERT_INTERVAL, DEFAULT_REASSERT_INTERVAL)
+            ): vol.All(vol.Coerce(int), vol.Range(min=0, max=3600)),
+            vol.Optional(
+                CONF_AIRTIME_BUDGET, 
+                default=current_config.get(CONF_AIRTIME_BUDGET, DEFAULT_AIRTIME_BUDGET)
+            ): vol.All(vol.Coerce(float), vol.Range(min=0.1, max=10)),
+            vol.Optional(
+                CONF_MESSAGE_EVENTS, 
+                default=current_config.get(CONF_MESSAGE_EVENTS, False)
+            ): bool,
+            vol.Optional(
+                CONF_EVENT_SENSOR_IDS, 
+                default=current_config.get(CONF_EVENT_SENSOR_IDS, "")
+            ): str,
+            vol.Optional(
+                CONF_EVENT_MESSAGE_TYPES, 
+                default=current_config.get(CONF_EVENT_MESSAGE_TYPES, "")
+            ): str,
+            vol.Optional("run_hardware_test", default=False): bool,
         })
 
         return self.async_show_form(
@@ -228,12 +393,27 @@ class EnergenieOptionsFlow(config_entries.OptionsFlow):
             if current_config.get(f"device_{i}_enabled", False):
                 name = current_config.get(f"device_{i}_name", f"Device {i}")
                 device_type = current_config.get(f"device_{i}_type", "unknown")
-                devices.append(f"Device {i}: {name} ({device_type})")
+                route = current_config.get(f"device_{i}_bridge") or ROUTE_LOCAL
+                devices.append(f"Device {i}: {name} ({device_type}, via {route})")
         
         if current_config.get(CONF_MOTION_SENSOR_ENABLED, False):
             sensor_name = current_config.get(CONF_MOTION_SENSOR_NAME, "Motion Sensor")
             devices.append(f"Motion Sensor: {sensor_name}")
         
+        if current_config.get(CONF_DOOR_SENSOR_ENABLED, False):
+            sensor_name = current_config.get(CONF_DOOR_SENSOR_NAME, DEFAULT_DOOR_SENSOR_NAME)
+            devices.append(f"Door Sensor: {sensor_name}")
+        
+        if current_config.get(CONF_POWER_MONITOR_ENABLED, False):
+            plug_name = current_config.get(CONF_POWER_MONITOR_NAME, DEFAULT_POWER_MONITOR_NAME)
+            devices.append(f"Smart Plug+ Power Monitor: {plug_name}")
+        
+        for g in range(1, MAX_GROUPS + 1):
+            if current_config.get(f"group_{g}_enabled", False):
+                group_name = current_config.get(f"group_{g}_name", f"Group {g}")
+                group_devices = current_config.get(f"group_{g}_devices", "")
+                devices.append(f"Group {g}: {group_name} (devices {group_devices})")
+        
         if not devices:
             return "No devices currently configured"
         
@@ -50,6 +50,8 @@ SERVICE_TURN_OFF_ALL = "turn_off_all"
 SERVICE_PAIR_DEVICE = "pair_device"
 SERVICE_LEARN_MODE = "learn_mode"
 SERVICE_ADD_DEVICE = "add_device"
+SERVICE_APPLY_SCENE = "apply_scene"
+SERVICE_START_PROFILE = "start_profile"
 
 # Motion sensor configuration
 CONF_MOTION_SENSOR_ENABLED = "motion_sensor_enabled"
@@ -60,6 +62,82 @@ CONF_MOTION_SENSOR_ID = "motion_sensor_id"
 DEFAULT_MOTION_SENSOR_NAME = "Energenie Motion Sensor"
 DEFAULT_MOTION_SENSOR_ID = "MIHO032"
 
+# Door/window sensor (MIHO012) configuration
+CONF_DOOR_SENSOR_ENABLED = "door_sensor_enabled"
+CONF_DOOR_SENSOR_NAME = "door_sensor_name"
+CONF_DOOR_SENSOR_ID = "door_sensor_id"
+
+# Default door sensor settings
+DEFAULT_DOOR_SENSOR_NAME = "Energenie Door Sensor"
+DEFAULT_DOOR_SENSOR_ID = "MIHO012"
+
+# Smart Plug+ (MIHO005) power monitoring configuration
+CONF_POWER_MONITOR_ENABLED = "power_monitor_enabled"
+CONF_POWER_MONITOR_NAME = "power_monitor_name"
+CONF_POWER_MONITOR_ID = "power_monitor_id"
+
+# Default power monitoring settings
+DEFAULT_POWER_MONITOR_NAME = "Energenie Smart Plug+"
+DEFAULT_POWER_MONITOR_ID = "MIHO005"
+
+# Network radio bridges
+CONF_BRIDGES = "bridges"  # Comma separated host[:port] list
+CONF_USE_LOCAL_RADIO = "use_local_radio"
+CONF_BRIDGE_TOKEN = "bridge_token"  # Shared token of bridges listening beyond localhost
+ROUTE_LOCAL = "local"  # device_N_bridge value for the locally attached board
+
+# Device number that addresses every device on the house code at once
+ALL_DEVICES = 0
+
+# Dispatcher signal sent when a device state is transmitted, per config entry
+SIGNAL_DEVICE_STATE = "energenie_{}_device_state"
+
+# Dispatcher signal sent when a radio goes down or comes back, per config entry
+SIGNAL_RADIO_AVAILABILITY = "energenie_{}_radio_availability"
+
+# Seconds between frames of pairing, learn and all on/off sequences
+SEQUENCE_INTERVAL = 0.5
+
+# Device groups switched by one bulk transmission
+MAX_GROUPS = 8
+CONF_GROUP_BROADCAST = "group_{}_broadcast"  # opt-in: one all-devices frame for the group
+SWITCHABLE_DEVICE_TYPES = [
+    DEVICE_TYPE_LIGHT,
+    DEVICE_TYPE_SWITCH,
+    DEVICE_TYPE_FAN,
+    DEVICE_TYPE_SOCKET,
+]
+# Device types the switch platform creates entities for
+SWITCH_DEVICE_TYPES = [
+    DEVICE_TYPE_SWITCH,
+    DEVICE_TYPE_FAN,
+    DEVICE_TYPE_SOCKET,
+]
+
+# Opt-in command tracing (spans written to energenie_trace.jsonl or OpenTelemetry)
+CONF_TRACING = "tracing"
+
+# Optional idle-time re-assertion of desired states (interval 0 = off)
+CONF_REASSERT_INTERVAL = "reassert_interval"  # seconds between re-asserted frames
+CONF_AIRTIME_BUDGET = "airtime_budget"  # percent of airtime background frames may use
+DEFAULT_REASSERT_INTERVAL = 0
+DEFAULT_AIRTIME_BUDGET = 1.0
+
+# Event fired for received messages, with optional filters (comma separated, empty = all)
+EVENT_MESSAGE = "energenie_message"
+CONF_MESSAGE_EVENTS = "message_events"
+CONF_EVENT_SENSOR_IDS = "event_sensor_ids"
+CONF_EVENT_MESSAGE_TYPES = "event_message_types"
+
+# hass.data keys for each config entry
+DATA_CONFIG = "config"
+DATA_RADIO = "radio"
+DATA_PLATFORMS = "platforms"
+DATA_FORWARDED = "forwarded"
+
+# Options that change how the radio itself is set up; changing them reloads the entry
+RELOAD_OPTIONS = [CONF_BRIDGES, CONF_BRIDGE_TOKEN, CONF_USE_LOCAL_RADIO, CONF_TRACING]
+
 # Device compatibility mapping - devices that work the same way
 COMPATIBLE_DEVICES = {
     "smart_plugs": {
@@ -93,4 +171,14 @@ DEVICE_TYPE_DESCRIPTIONS = {
     DEVICE_TYPE_LIGHT: "Light - Shows as light entity with brightness icon",
     DEVICE_TYPE_SWITCH: "Switch - Shows as switch entity with power icon",
     DEVICE_TYPE_MOTION_SENSOR: "Motion Sensor - Detects movement"
-}
\ No newline at end of file
+}
+
+
+def parse_device_list(value):
+    """Parse "1, 2, 5" into a list of unique device numbers (1-16)."""
+    devices = []
+    for item in str(value or "").replace(";", ",").split(","):
+        item = item.strip()
+        if item.isdigit() and 1 <= int(item) <= 16 and int(item) not in devices:
+            devices.append(int(item))
+    return devices
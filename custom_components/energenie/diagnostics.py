@@ -0,0 +1,32 @@
+"""Diagnostics support for Energenie ENER314-RT."""
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DATA_CONFIG, DATA_RADIO, DOMAIN
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict:
+    """Return the radio counters and recent traffic of a config entry."""
+    entry_data = hass.data.get(DOMAIN, {}).get(entry.entry_id)
+    if entry_data is None:
+        return {"config": dict(entry.data), "options": dict(entry.options), "loaded": False}
+
+    radio = entry_data[DATA_RADIO]
+    return {
+        "config": entry_data[DATA_CONFIG],
+        "loaded": True,
+        "radio": {
+            "local_available": radio.local_available,
+            "duplicates_suppressed": radio.duplicates_suppressed,
+            "decode_errors": radio.decode_errors,
+            "reassert_sent": radio.reassert_sent,
+            "reassert_skipped": radio.reassert_skipped,
+            "airtime_share": round(radio.airtime.share(), 4),
+            "frame_cache_hits": radio.frames.hits,
+            "frame_cache_misses": radio.frames.misses,
+            "timers_pending": len(radio.timers),
+            "device_states": radio.device_states,
+        },
+        "duty": radio.duty.as_dict(),
+        "history": radio.history.as_list(),
+    }
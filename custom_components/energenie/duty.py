@@ -0,0 +1,167 @@
+"""Transmit/receive mode scheduling for the half-duplex ENER314-RT.
+
+The board cannot listen while it transmits, so a sensor report that
+arrives during a long pairing run or a turn_on_all burst used to be lost.
+A ModeScheduler runs inside one radio session and puts the radio back in
+receive mode whenever it is not sending: during the gaps of a paced
+sequence, and in receive windows it inserts so that at least MIN_RX_SHARE
+of a long transmit job is spent listening. Gaps of a paced sequence can
+also carry short jobs queued meanwhile, so a single switch command does
+not wait for a whole pairing or learn run. This module has no Home
+Assistant dependencies.
+"""
+import time
+
+MIN_RX_SHARE = 0.25  # fraction of a transmit job reserved for receiving
+TX_SLICE = 1.0  # seconds of transmitting before a receive window is forced
+MIN_LISTEN = 0.02  # gaps shorter than this are not worth a mode change
+RX_POLL = 0.005  # seconds between FIFO checks while listening
+MAX_MESSAGES_PER_SESSION = 64  # upper bound on messages kept from one session
+INTERLEAVE_GAP = 0.3  # seconds of gap needed to send a queued short job
+
+
+class DutyStats:
+    """Time spent transmitting and receiving during transmit sessions."""
+
+    __slots__ = ("sessions", "jobs", "tx_time", "rx_time", "windows", "rx_during_tx", "overruns")
+
+    def __init__(self):
+        """Initialize the counters."""
+        self.sessions = 0
+        self.jobs = 0
+        self.tx_time = 0.0
+        self.rx_time = 0.0
+        self.windows = 0  # receive windows opened between frames
+        self.rx_during_tx = 0  # messages caught that used to be missed
+        self.overruns = 0  # transmit stretches longer than TX_SLICE with no window
+
+    @property
+    def rx_share(self):
+        """Return the fraction of session time spent receiving."""
+        total = self.tx_time + self.rx_time
+        return self.rx_time / total if total else 1.0
+
+    def add(self, other):
+        """Add the counters of another DutyStats."""
+        for name in self.__slots__:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def as_dict(self):
+        """Return the counters for diagnostics, times in seconds."""
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data["tx_time"] = round(self.tx_time, 3)
+        data["rx_time"] = round(self.rx_time, 3)
+        data["rx_share"] = round(self.rx_share, 3)
+        return data
+
+
+class ModeScheduler:
+    """Switches one radio session between transmitting and receiving.
+
+    Wrap the send function with send() and pass sleep() as run_paced's
+    sleep. Every second spent transmitting adds share / (1 - share)
+    seconds of receive time owed; gaps in a paced sequence pay it off, and
+    once TX_SLICE worth is owed a window is opened before the next frame.
+    finish() pays what is left and leaves the radio receiving.
+
+    radio is pyenergenie's low level radio module, or None when it cannot
+    receive raw payloads, in which case nothing can be heard between
+    frames and the scheduler only counts transmit time.
+    before_transmit() is called before the first frame after listening,
+    to put the radio back into transmit mode.
+    next_job() is called in gaps of at least INTERLEAVE_GAP and returns a
+    function sending a short job queued meanwhile, or None.
+    """
+
+    def __init__(self, radio=None, before_transmit=None, share=MIN_RX_SHARE,
+                 tx_slice=TX_SLICE, clock=time.monotonic, sleep=time.sleep, next_job=None):
+        """Initialize the scheduler for one session."""
+        self._radio = radio
+        self._before_transmit = before_transmit
+        self._next_job = next_job
+        self._ratio = share / (1 - share)
+        self._tx_slice = tx_slice
+        self._window = tx_slice * self._ratio
+        self._clock = clock
+        self._sleep = sleep
+        self._owed = 0.0
+        self._listening = False
+        self.messages = []  # raw payloads received during the session
+        self.stats = DutyStats()
+        self.stats.sessions = 1
+
+    def send(self, send):
+        """Return send wrapped to account for its transmit time."""
+
+        def scheduled_send(*command):
+            if self._radio is not None and self._owed >= self._window:
+                self.stats.windows += 1
+                self._listen(self._owed)
+            if self._listening and self._before_transmit is not None:
+                self._before_transmit()
+            self._listening = False
+            start = self._clock()
+            send(*command)
+            took = self._clock() - start
+            if took > self._tx_slice:
+                self.stats.overruns += 1
+            self.stats.tx_time += took
+            self._owed += took * self._ratio
+
+        return scheduled_send
+
+    def sleep(self, delay):
+        """Wait delay seconds, sending short jobs and listening if the gap is long enough."""
+        if self._next_job is not None and delay >= INTERLEAVE_GAP:
+            deadline = self._clock() + delay
+            while deadline - self._clock() >= INTERLEAVE_GAP:
+                job = self._next_job()
+                if job is None:
+                    break
+                job()
+            delay = deadline - self._clock()
+            if delay <= 0:
+                return
+        if self._radio is None or delay < MIN_LISTEN:
+            self._sleep(delay)
+            return
+        self._listen(delay)
+
+    def job_done(self):
+        """Count a finished transmit job."""
+        self.stats.jobs += 1
+
+    def finish(self):
+        """Leave the radio receiving, first paying off a full window still owed.
+
+        A short job owes less than a window; it is not held up, so the
+        next command is not delayed.
+        """
+        if self._radio is None:
+            return
+        if self._owed >= self._window:
+            self.stats.windows += 1
+            self._listen(self._owed)
+        elif not self._listening:
+            self._radio.receiver(fsk=True)
+
+    def _listen(self, duration):
+        """Receive for duration seconds, keeping what arrives."""
+        start = self._clock()
+        deadline = start + duration
+        if not self._listening:
+            self._radio.receiver(fsk=True)
+            self._listening = True
+        while True:
+            while self._radio.is_receive_waiting():
+                payload = self._radio.receive_cbp()
+                self.stats.rx_during_tx += 1
+                if len(self.messages) < MAX_MESSAGES_PER_SESSION:
+                    self.messages.append(payload)
+            remaining = deadline - self._clock()
+            if remaining <= 0:
+                break
+            self._sleep(min(RX_POLL, remaining))
+        listened = self._clock() - start
+        self.stats.rx_time += listened
+        self._owed = max(self._owed - listened, 0.0)
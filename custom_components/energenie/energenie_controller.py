@@ -8,16 +8,122 @@ Designed for Raspberry Pi with Home Assistant integration
 Compatible with shell_command and command_line platforms
 """
 
-import argparse
-import sys
 import time
+
+# Taken straight after importing time and before every other import, so
+# --timing can attribute the cost of the imports that follow
+_SCRIPT_START = time.monotonic()
+
+import argparse
 import json
 import os
+import sys
+from contextlib import contextmanager
+
+_GPIOZERO_IMPORT_START = time.monotonic()
 from gpiozero import Energenie
+_GPIOZERO_IMPORT_END = time.monotonic()
+
+# Upper bounds (milliseconds) of the latency histogram buckets used by --timing
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000]
 
 # Configuration file path
 CONFIG_FILE = "energenie_config.json"
 
+def _process_start_monotonic():
+    """Estimate the monotonic time at which the interpreter process started.
+
+    Uses /proc/self/stat, so this only works on Linux (which includes the Pi).
+    Returns None when the start time cannot be determined.
+    """
+    try:
+        with open("/proc/self/stat") as f:
+            stat = f.read()
+        # Fields after the command name, which may itself contain spaces
+        fields = stat.rsplit(")", 1)[1].split()
+        start_ticks = int(fields[19])
+        started_after_boot = start_ticks / os.sysconf("SC_CLK_TCK")
+        running_for = time.clock_gettime(time.CLOCK_BOOTTIME) - started_after_boot
+        return time.monotonic() - running_for
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class TimingReport:
+    """Collect monotonic phase timestamps and transmit latencies for --timing"""
+
+    def __init__(self):
+        self.phases = []
+        self.latencies = []
+        process_start = _process_start_monotonic()
+        if process_start is not None and process_start < _SCRIPT_START:
+            self.add_phase("interpreter_start", process_start, _SCRIPT_START)
+        self.add_phase("gpiozero_import", _GPIOZERO_IMPORT_START, _GPIOZERO_IMPORT_END)
+
+    def add_phase(self, name, start, end, device=None):
+        """Record a phase that ran between two monotonic timestamps"""
+        phase = {
+            "phase": name,
+            "start": round(start - _SCRIPT_START, 6),
+            "end": round(end - _SCRIPT_START, 6),
+            "duration_ms": round((end - start) * 1000, 3),
+        }
+        if device is not None:
+            phase["device"] = device
+        self.phases.append(phase)
+
+    @contextmanager
+    def phase(self, name, device=None):
+        """Time the enclosed block as a named phase"""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            end = time.monotonic()
+            self.add_phase(name, start, end, device)
+            if name == "transmit":
+                self.latencies.append(end - start)
+
+    def histogram(self):
+        """Bucket the recorded transmit latencies (milliseconds)"""
+        buckets = {f"le_{bound}ms": 0 for bound in LATENCY_BUCKETS_MS}
+        buckets["inf"] = 0
+        for latency in self.latencies:
+            latency_ms = latency * 1000
+            for bound in LATENCY_BUCKETS_MS:
+                if latency_ms <= bound:
+                    buckets[f"le_{bound}ms"] += 1
+                    break
+            else:
+                buckets["inf"] += 1
+        return buckets
+
+    def to_dict(self, batch=False):
+        """Return the report in its JSON form"""
+        report = {
+            "clock": "monotonic",
+            "reference": "script_start",
+            "phases": self.phases,
+            "total_ms": round((time.monotonic() - _SCRIPT_START) * 1000, 3),
+        }
+        if batch and self.latencies:
+            latencies_ms = sorted(latency * 1000 for latency in self.latencies)
+            report["latency"] = {
+                "count": len(latencies_ms),
+                "min_ms": round(latencies_ms[0], 3),
+                "max_ms": round(latencies_ms[-1], 3),
+                "mean_ms": round(sum(latencies_ms) / len(latencies_ms), 3),
+                "histogram": self.histogram(),
+            }
+        return report
+
+
+@contextmanager
+def _no_timing(name, device=None):
+    """Stand-in for TimingReport.phase when --timing is not given"""
+    yield
+
+
 def load_config():
     """Load device configuration from JSON file"""
     default_config = {
@@ -140,33 +246,44 @@ def show_menu():
     print("0. Exit")
     print("="*60)
 
-def control_device(device_num, action, quiet=False):
+def control_device(device_num, action, quiet=False, timing=None):
     """Control a specific device"""
-    config = load_config()
+    phase = timing.phase if timing else _no_timing
+
+    with phase("config_load"):
+        config = load_config()
     
     try:
         if device_num == 0:  # All devices
-            devices = [Energenie(1), Energenie(2), Energenie(3), Energenie(4)]
+            devices = []
+            for i in range(1, 5):
+                with phase("pin_setup", device=i):
+                    devices.append(Energenie(i))
             for i, device in enumerate(devices, 1):
                 device_info = config["devices"][str(i)]
                 if action.lower() == 'on':
-                    device.on()
+                    with phase("transmit", device=i):
+                        device.on()
                     if not quiet:
                         print(f"{device_info['name']} turned ON")
                 else:
-                    device.off()
+                    with phase("transmit", device=i):
+                        device.off()
                     if not quiet:
                         print(f"{device_info['name']} turned OFF")
                 time.sleep(0.5)  # Small delay between commands
         else:
-            device = Energenie(device_num)
+            with phase("pin_setup", device=device_num):
+                device = Energenie(device_num)
             device_info = config["devices"][str(device_num)]
             if action.lower() == 'on':
-                device.on()
+                with phase("transmit", device=device_num):
+                    device.on()
                 if not quiet:
                     print(f"{device_info['name']} turned ON")
             else:
-                device.off()
+                with phase("transmit", device=device_num):
+                    device.off()
                 if not quiet:
                     print(f"{device_info['name']} turned OFF")
     
@@ -232,6 +349,7 @@ Examples:
   python energenie_controller.py --device 1 --action on
   python energenie_controller.py --device 2 --action off
   python energenie_controller.py --device all --action on
+  python energenie_controller.py --device all --action off --quiet --timing
   python energenie_controller.py  (for interactive mode)
         """
     )
@@ -248,6 +366,9 @@ Examples:
     parser.add_argument('--status', 
                        action='store_true',
                        help='Show device status and exit (for Home Assistant)')
+    parser.add_argument('--timing',
+                       action='store_true',
+                       help='Print a JSON report of where the time went in this invocation')
     
     args = parser.parse_args()
     
@@ -270,7 +391,12 @@ Examples:
     # Check if running in command line mode
     if args.device and args.action:
         device_num = 0 if args.device == 'all' else int(args.device)
-        success = control_device(device_num, args.action, args.quiet)
+        timing = TimingReport() if args.timing else None
+        success = control_device(device_num, args.action, args.quiet, timing)
+        if timing:
+            report = timing.to_dict(batch=device_num == 0)
+            report["success"] = success
+            print(json.dumps(report, indent=2))
         sys.exit(0 if success else 1)
     
     # If no command line arguments or incomplete arguments, run interactive mode
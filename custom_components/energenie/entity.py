@@ -0,0 +1,124 @@
+"""Base entities shared by the Energenie platforms."""
+import logging
+
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity import DeviceInfo, Entity
+
+from .const import DOMAIN, MANUFACTURER, MODEL
+from .tracing import trace_event, traced
+
+_LOGGER = logging.getLogger(__name__)
+
+CONTROLLER_NAME = "Energenie ENER314-RT Controller"
+
+_device_infos = {}
+
+
+def controller_device_info(entry_id: str) -> DeviceInfo:
+    """Return the DeviceInfo of an entry's controller, built once per entry."""
+    device_info = _device_infos.get(entry_id)
+    if device_info is None:
+        device_info = DeviceInfo(
+            identifiers={(DOMAIN, entry_id)},
+            name=CONTROLLER_NAME,
+            manufacturer=MANUFACTURER,
+            model=MODEL,
+        )
+        _device_infos[entry_id] = device_info
+    return device_info
+
+
+def forget_controller_device_info(entry_id: str) -> None:
+    """Drop the cached DeviceInfo of an unloaded entry."""
+    _device_infos.pop(entry_id, None)
+
+
+class EnergenieEntity(Entity):
+    """An entity belonging to an entry's ENER314-RT controller.
+
+    Name, unique ID and device info are set once as _attr_* fields, so
+    writing state does not rebuild them.
+    """
+
+    _attr_should_poll = False
+
+    def __init__(self, name: str, unique_id: str, entry_id: str, radio) -> None:
+        """Initialize the entity."""
+        self._entry_id = entry_id
+        self._radio = radio
+        self._attr_name = name
+        self._attr_unique_id = unique_id
+        self._attr_device_info = controller_device_info(entry_id)
+
+    @callback
+    def async_update_from(self, other: "EnergenieEntity") -> None:
+        """Take over the name of a reconfigured entity."""
+        if other._attr_name != self._attr_name:
+            self._attr_name = other._attr_name
+            if self.hass is not None:
+                self.async_write_ha_state()
+
+    async def async_added_to_hass(self) -> None:
+        """Follow radio availability."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass, self._radio.availability_signal, self.async_write_ha_state
+            )
+        )
+
+
+class EnergenieDeviceEntity(EnergenieEntity):
+    """An on/off Energenie device switched by the entry's radio."""
+
+    _platform = "switch"
+
+    def __init__(self, device_num: int, name: str, entry_id: str, radio) -> None:
+        """Initialize the device."""
+        super().__init__(
+            name, f"{DOMAIN}_{entry_id}_{self._platform}_{device_num}", entry_id, radio
+        )
+        self._device_num = device_num
+        # Start from the state journalled before the last restart
+        self._attr_is_on = radio.device_states.get(device_num, False)
+
+    @property
+    def available(self) -> bool:
+        """Return False while no radio can reach the device."""
+        return self._radio.device_available(self._device_num)
+
+    async def async_added_to_hass(self) -> None:
+        """Follow the states transmitted to this device and radio availability."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass, self._radio.state_signal, self._handle_state_sent
+            )
+        )
+
+    @callback
+    def _handle_state_sent(self, device_nums, on) -> None:
+        """Update the entity when a state has been sent to its device."""
+        if self._device_num in device_nums and self._attr_is_on != on:
+            self._attr_is_on = on
+            self.async_write_ha_state()
+            trace_event("state_write")
+
+    async def async_turn_on(self, **kwargs) -> None:
+        """Turn the device on."""
+        await self._async_switch(True)
+
+    async def async_turn_off(self, **kwargs) -> None:
+        """Turn the device off."""
+        await self._async_switch(False)
+
+    async def _async_switch(self, on: bool) -> None:
+        """Send the command; the state follows once the radio has sent it."""
+        action = "on" if on else "off"
+        with traced(self._radio.tracer, f"{self._platform}.turn_{action}", device=self._device_num):
+            try:
+                await self._radio.async_send(self._device_num, on)
+                _LOGGER.info("Turned %s %s (device %d)", action, self._attr_name, self._device_num)
+            except Exception as e:
+                _LOGGER.error("Error turning %s %s: %s", action, self._attr_name, e)
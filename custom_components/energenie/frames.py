@@ -0,0 +1,92 @@
+"""Cache of encoded OOK switch frames for Energenie devices.
+
+The frame for a given house code, device and command never changes, so it
+is encoded once and the same payload is handed to the radio every time.
+This module has no Home Assistant dependencies so the network bridge can
+use it too.
+"""
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class FrameCache:
+    """Encoded payloads keyed by (house code, device number, on).
+
+    Encoding uses pyenergenie's OOK encoder and transmission writes the
+    cached payload straight to the radio. When the installed pyenergenie
+    does not expose those low level modules, the cache reports itself as
+    unavailable and callers fall back to switch_on()/switch_off().
+    """
+
+    def __init__(self, house_code=None):
+        """Initialize the cache; house_code None means pyenergenie's default."""
+        self.house_code = house_code
+        self._frames = {}
+        self._encoder = None
+        self._radio = None
+        self._available = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def available(self):
+        """Return True if frames can be encoded and sent directly."""
+        if self._available is None:
+            try:
+                from energenie import encoder, radio
+
+                self._encoder = encoder.build_switch_msg
+                self._radio = radio
+                self._available = callable(getattr(radio, "transmit", None))
+            except (ImportError, AttributeError) as e:
+                _LOGGER.debug("Direct OOK transmit not available, using switch_on/off: %s", e)
+                self._available = False
+        return self._available
+
+    def get(self, device_num, on):
+        """Return the encoded frame for a device and command, building it once."""
+        key = (self.house_code, device_num, bool(on))
+        frame = self._frames.get(key)
+        if frame is not None:
+            self.hits += 1
+            return frame
+
+        self.misses += 1
+        if self.house_code is None:
+            frame = self._encoder(bool(on), device_address=device_num)
+        else:
+            frame = self._encoder(bool(on), device_address=device_num, house_address=self.house_code)
+        self._frames[key] = frame
+        return frame
+
+    def warm(self, device_nums):
+        """Encode the on and off frames of devices ahead of use."""
+        if not self.available:
+            return
+        for device_num in device_nums:
+            self.get(device_num, True)
+            self.get(device_num, False)
+
+    def prepare_radio(self):
+        """Put the radio in OOK transmit mode; call before sending after receiving.
+
+        transmitter() switches the RFM69 out of receive mode as well as
+        setting the modulation; older pyenergenie versions without it only
+        get the modulation set.
+        """
+        transmitter = getattr(self._radio, "transmitter", None)
+        if transmitter is not None:
+            transmitter(ook=True)
+            return
+        modulation = getattr(self._radio, "modulation", None)
+        if modulation is not None:
+            modulation(ook=True)
+
+    def transmit(self, device_num, on):
+        """Send the cached frame for a device and command."""
+        self._radio.transmit(self.get(device_num, on))
+
+    def __len__(self):
+        """Return the number of cached frames."""
+        return len(self._frames)
@@ -0,0 +1,84 @@
+"""Fixed-size history of recent radio traffic for diagnostics."""
+import time
+from datetime import datetime
+
+HISTORY_SIZE = 200  # entries kept per config entry
+SUMMARY_LENGTH = 120  # characters kept of a received message summary
+
+
+class HistoryEntry:
+    """One transmitted or received frame; reused when the buffer wraps."""
+
+    __slots__ = ("timestamp", "direction", "device", "route", "summary", "outcome", "latency_ms")
+
+    def __init__(self):
+        """Initialize an empty entry."""
+        self.timestamp = 0.0
+        self.direction = None
+        self.device = None
+        self.route = None
+        self.summary = None
+        self.outcome = None
+        self.latency_ms = None
+
+    def as_dict(self):
+        """Return the entry for the diagnostics download."""
+        return {
+            "time": datetime.fromtimestamp(self.timestamp).isoformat(timespec="milliseconds"),
+            "direction": self.direction,
+            "device": self.device,
+            "route": self.route,
+            "summary": self.summary,
+            "outcome": self.outcome,
+            "latency_ms": self.latency_ms,
+        }
+
+
+class RadioHistory:
+    """Ring buffer of the most recent TX and RX entries.
+
+    The entries are allocated once; recording overwrites the oldest one in
+    place, so memory stays fixed and nothing touches the disk.
+    """
+
+    def __init__(self, size=HISTORY_SIZE):
+        """Allocate the buffer."""
+        self._entries = [HistoryEntry() for _ in range(size)]
+        self._next = 0
+        self._count = 0
+
+    def __len__(self):
+        """Return the number of entries recorded, up to the buffer size."""
+        return self._count
+
+    def _record(self, direction, device, route, summary, outcome, latency):
+        """Overwrite the oldest entry."""
+        entry = self._entries[self._next]
+        entry.timestamp = time.time()
+        entry.direction = direction
+        entry.device = device
+        entry.route = route
+        entry.summary = summary
+        entry.outcome = outcome
+        entry.latency_ms = None if latency is None else round(latency * 1000, 1)
+        self._next = (self._next + 1) % len(self._entries)
+        self._count = min(self._count + 1, len(self._entries))
+
+    def record_tx(self, commands, route, outcome, latency):
+        """Record frames sent as (device, on) commands through route."""
+        devices = [device_num for device_num, _ in commands]
+        states = {on for _, on in commands}
+        summary = ("on" if True in states else "off") if len(states) == 1 else "mixed"
+        self._record(
+            "tx", devices[0] if len(devices) == 1 else devices, route, summary, outcome, latency
+        )
+
+    def record_rx(self, sensor_id, summary, outcome):
+        """Record a received message and what happened to it."""
+        self._record("rx", sensor_id, None, str(summary)[:SUMMARY_LENGTH], outcome, None)
+
+    def as_list(self):
+        """Return the entries, oldest first."""
+        size = len(self._entries)
+        start = (self._next - self._count) % size
+        return [self._entries[(start + index) % size].as_dict() for index in range(self._count)]
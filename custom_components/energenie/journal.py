@@ -0,0 +1,113 @@
+"""Append-only journal of the desired state of one-way Energenie devices.
+
+OOK sockets never report their state, so the integration remembers what
+each device was last told. Every desired state is appended to the journal
+when a command is made, and again once the radio has sent it. After a
+restart or a failure halfway through a batch, devices whose last command
+was never confirmed can be commanded again.
+
+The journal is a JSON-lines file of [device, on, sent] records. It is
+rewritten with one record per device when it is loaded and whenever it
+grows past COMPACT_LINES. This module has no Home Assistant dependencies.
+"""
+import json
+import logging
+import os
+import threading
+from collections import deque
+
+_LOGGER = logging.getLogger(__name__)
+
+JOURNAL_FILE = "energenie.{}.journal"  # in .storage, per config entry
+COMPACT_LINES = 512  # records appended before the file is compacted
+
+
+class CommandJournal:
+    """Desired device states, persisted as an append-only file.
+
+    record() is called from the event loop and only updates memory;
+    load() and flush() do the file work and belong in an executor.
+    """
+
+    def __init__(self, path, compact_lines=COMPACT_LINES):
+        """Initialize the journal."""
+        self.path = path
+        self._compact_lines = compact_lines
+        self._states = {}  # device_num -> (on, sent)
+        self._pending = deque()  # appended on the loop, drained by flush()
+        self._lines = 0
+        self._lock = threading.Lock()
+
+    @property
+    def states(self):
+        """Return the desired state of each device as (on, sent)."""
+        return dict(self._states)
+
+    @property
+    def has_pending(self):
+        """Return True if records are waiting to be written."""
+        return bool(self._pending)
+
+    def unconfirmed(self):
+        """Return device_num -> on for devices whose last command was not sent."""
+        return {device_num: on for device_num, (on, sent) in self._states.items() if not sent}
+
+    def record(self, device_num, on, sent):
+        """Note the desired state of a device and whether it has been sent."""
+        state = (bool(on), bool(sent))
+        if self._states.get(device_num) == state:
+            return
+        self._states[device_num] = state
+        self._pending.append([device_num, state[0], state[1]])
+
+    def load(self):
+        """Read the journal and compact it."""
+        with self._lock:
+            try:
+                with open(self.path, encoding="utf-8") as journal:
+                    for line in journal:
+                        try:
+                            device_num, on, sent = json.loads(line)
+                        except ValueError:
+                            # A torn last line from a crash mid-write
+                            _LOGGER.debug("Skipping unreadable journal line: %r", line)
+                            continue
+                        self._states[int(device_num)] = (bool(on), bool(sent))
+            except FileNotFoundError:
+                return
+            self._compact()
+        _LOGGER.debug("Loaded Energenie journal with %d device(s)", len(self._states))
+
+    def flush(self):
+        """Append the pending records, compacting the file when it is long."""
+        with self._lock:
+            pending = []
+            while self._pending:
+                pending.append(self._pending.popleft())
+            if not pending:
+                return
+            with open(self.path, "a", encoding="utf-8") as journal:
+                journal.writelines(json.dumps(record) + "\n" for record in pending)
+            self._lines += len(pending)
+            if self._lines > self._compact_lines:
+                self._compact()
+
+    def _compact(self):
+        """Rewrite the file with one record per device."""
+        states = dict(self._states)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as journal:
+            journal.writelines(
+                json.dumps([device_num, on, sent]) + "\n"
+                for device_num, (on, sent) in sorted(states.items())
+            )
+        os.replace(temp_path, self.path)
+        self._lines = len(states)
+
+    def remove(self):
+        """Delete the journal file."""
+        with self._lock:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
@@ -2,7 +2,7 @@
 import asyncio
 import logging
 
-from homeassistant.components.light import LightEntity
+from homeassistant.components.light import ColorMode, LightEntity
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
@@ -18,7 +18,11 @@ from .const import (
     CONF_DEVICE_3_TYPE,
     CONF_DEVICE_4_NAME,
     CONF_DEVICE_4_TYPE,
+    DATA_RADIO,
+    DATA_PLATFORMS,
 )
+from .entity import EnergenieDeviceEntity
+from .platform_sync import PlatformEntities
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -28,10 +32,24 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up Energenie lights from a config entry."""
+    entry_data = hass.data[DOMAIN][config_entry.entry_id]
+    radio = entry_data[DATA_RADIO]
+
+    platform = PlatformEntities(
+        hass,
+        lambda config: _build_lights(config, config_entry.entry_id, radio),
+        async_add_entities,
+    )
+    entry_data[DATA_PLATFORMS]["light"] = platform
+    platform.async_apply(config_entry.data)
+
+
+def _build_lights(config, entry_id: str, radio) -> dict:
+    """Return the light entities config asks for, by unique ID."""
     lights = []
     
     # Get number of devices to check (default to 16 for full range)
-    num_devices = config_entry.data.get("num_devices", 16)
+    num_devices = config.get("num_devices", 16)
     
     # Check all possible device slots up to the configured number
     for i in range(1, num_devices + 1):
@@ -40,78 +58,15 @@ async def async_setup_entry(
         device_name_key = f"device_{i}_name"
         
         # Only create lights for enabled devices of light type
-        if config_entry.data.get(device_enabled_key, False) and config_entry.data.get(device_type_key) == DEVICE_TYPE_LIGHT:
-            device_name = config_entry.data.get(device_name_key, f"Energenie Device {i}")
-            lights.append(EnergenieLight(i, device_name, config_entry.entry_id))
+        if config.get(device_enabled_key, False) and config.get(device_type_key) == DEVICE_TYPE_LIGHT:
+            device_name = config.get(device_name_key, f"Energenie Device {i}")
+            lights.append(EnergenieLight(i, device_name, entry_id, radio))
 
-    if lights:
-        async_add_entities(lights, True)
+    return {light.unique_id: light for light in lights}
 
-class EnergenieLight(LightEntity):
+class EnergenieLight(EnergenieDeviceEntity, LightEntity):
     """Representation of an Energenie Light."""
 
-    def __init__(self, device_num: int, name: str, entry_id: str) -> None:
-        """Initialize the light."""
-        self._device_num = device_num
-        self._name = name
-        self._entry_id = entry_id
-        self._is_on = False
-        self._attr_unique_id = f"{DOMAIN}_{entry_id}_light_{device_num}"
-
-    @property
-    def name(self) -> str:
-        """Return the name of the light."""
-        return self._name
-
-    @property
-    def is_on(self) -> bool:
-        """Return true if light is on."""
-        return self._is_on
-
-    @property
-    def device_info(self):
-        """Return device information."""
-        return {
-            "identifiers": {(DOMAIN, self._entry_id)},
-            "name": "Energenie ENER314-RT Controller",
-            "manufacturer": "Energenie",
-            "model": "ENER314-RT",
-        }
-
-    async def async_turn_on(self, **kwargs) -> None:
-        """Turn the light on."""
-        try:
-            import energenie
-        except ImportError as e:
-            _LOGGER.error("pyenergenie library not available: %s", e)
-            _LOGGER.error("Cannot control device - pyenergenie library is required")
-            return
-            
-        try:
-            energenie.init()
-            energenie.switch_on(self._device_num)
-            energenie.finished()
-            self._is_on = True
-            self.async_write_ha_state()
-            _LOGGER.info("Turned on %s (device %d)", self._name, self._device_num)
-        except Exception as e:
-            _LOGGER.error("Error turning on %s: %s", self._name, e)
-
-    async def async_turn_off(self, **kwargs) -> None:
-        """Turn the light off."""
-        try:
-            import energenie
-        except ImportError as e:
-            _LOGGER.error("pyenergenie library not available: %s", e)
-            _LOGGER.error("Cannot control device - pyenergenie library is required")
-            return
-            
-        try:
-            energenie.init()
-            energenie.switch_off(self._device_num)
-            energenie.finished()
-            self._is_on = False
-            self.async_write_ha_state()
-            _LOGGER.info("Turned off %s (device %d)", self._name, self._device_num)
-        except Exception as e:
-            _LOGGER.error("Error turning off %s: %s", self._name, e)
\ No newline at end of file
+    _platform = "light"
+    _attr_color_mode = ColorMode.ONOFF
+    _attr_supported_color_modes = {ColorMode.ONOFF}
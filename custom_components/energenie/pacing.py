@@ -0,0 +1,70 @@
+"""Drift-free pacing of radio frame sequences.
+
+Frames are scheduled against a monotonic deadline clock: frame n is due at
+start + n * interval, however long the sends before it took, so timing
+errors do not add up over a long pairing or learn run. This module has no
+Home Assistant dependencies so the network bridge can use it too.
+"""
+import time
+
+
+class PacingReport:
+    """Achieved timing of one paced sequence.
+
+    Jitter is how late each frame started against its deadline. started
+    is the monotonic time the sequence began, when it ran in this process.
+    """
+
+    __slots__ = ("frames", "interval", "max_jitter", "mean_jitter", "duration", "started")
+
+    def __init__(self, frames, interval, jitters, duration, started=None):
+        """Summarise the measured jitters."""
+        self.frames = frames
+        self.interval = interval
+        self.max_jitter = max(jitters, default=0.0)
+        self.mean_jitter = sum(jitters) / len(jitters) if jitters else 0.0
+        self.duration = duration
+        self.started = started
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a report sent by a bridge, or return None if there is none."""
+        if not data:
+            return None
+        report = cls(data["frames"], data["interval"], (), data["duration_ms"] / 1000)
+        report.max_jitter = data["max_jitter_ms"] / 1000
+        report.mean_jitter = data["mean_jitter_ms"] / 1000
+        return report
+
+    def to_dict(self):
+        """Return the report as JSON friendly values, times in milliseconds."""
+        return {
+            "frames": self.frames,
+            "interval": self.interval,
+            "max_jitter_ms": round(self.max_jitter * 1000, 3),
+            "mean_jitter_ms": round(self.mean_jitter * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+        }
+
+    def __str__(self):
+        """Return a one line summary for the log."""
+        return "%d frame(s) every %.3fs, jitter max %.2f ms, mean %.2f ms" % (
+            self.frames, self.interval, self.max_jitter * 1000, self.mean_jitter * 1000,
+        )
+
+
+def run_paced(commands, interval, send, clock=time.monotonic, sleep=time.sleep):
+    """Call send(*command) for each command, interval seconds apart.
+
+    Blocks the calling thread; returns a PacingReport.
+    """
+    start = clock()
+    jitters = []
+    for index, command in enumerate(commands):
+        deadline = start + index * interval
+        delay = deadline - clock()
+        if delay > 0:
+            sleep(delay)
+        jitters.append(max(clock() - deadline, 0.0))
+        send(*command)
+    return PacingReport(len(jitters), interval, jitters, clock() - start, start)
@@ -0,0 +1,56 @@
+"""Keep the entities of a platform in step with the config entry."""
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class PlatformEntities:
+    """The entities one platform created for a config entry.
+
+    build(config) returns the wanted entities keyed by unique ID. Applying
+    a new config adds the entities that are new, removes the ones that are
+    no longer wanted and lets the others update themselves in place, so
+    unchanged entities keep running.
+    """
+
+    def __init__(self, hass: HomeAssistant, build, async_add_entities) -> None:
+        """Initialize the platform entities."""
+        self.hass = hass
+        self._build = build
+        self._async_add_entities = async_add_entities
+        self._entities = {}
+
+    @callback
+    def async_apply(self, config):
+        """Bring the platform's entities in line with config."""
+        wanted = self._build(config)
+
+        for unique_id in [uid for uid in self._entities if uid not in wanted]:
+            self._async_remove(self._entities.pop(unique_id))
+
+        added = []
+        for unique_id, entity in wanted.items():
+            existing = self._entities.get(unique_id)
+            if existing is None:
+                self._entities[unique_id] = entity
+                added.append(entity)
+            elif existing is not entity and hasattr(existing, "async_update_from"):
+                existing.async_update_from(entity)
+
+        if added:
+            self._async_add_entities(added)
+        return added
+
+    @callback
+    def _async_remove(self, entity):
+        """Remove an entity that is no longer configured."""
+        _LOGGER.info("Removing Energenie entity %s", entity.entity_id or entity.unique_id)
+        registry = er.async_get(self.hass)
+        if entity.entity_id and registry.async_get(entity.entity_id):
+            # Removing the registry entry also removes the entity from hass
+            registry.async_remove(entity.entity_id)
+        elif entity.hass is not None:
+            self.hass.async_create_task(entity.async_remove())
@@ -0,0 +1,191 @@
+"""Cached probe of the libraries and hardware of a locally attached board.
+
+Checking for RPi.GPIO and pyenergenie and running a full energenie.init()
+and finished() cycle takes the radio through a reset, and used to happen
+in the config flow and again on every start and reload. The result of a
+probe is stored together with a fingerprint of what it depends on: the
+installed library versions, the SPI device nodes and the board model. A
+later probe reuses the stored result while the fingerprint is unchanged,
+so the hardware is only tested again after an upgrade, a board or
+configuration change, or when forced from the options flow.
+
+Attaching or powering up the ENER314-RT does not change the fingerprint:
+the board has no ID EEPROM and its SPI device node exists whether or not
+it is fitted. A failed hardware test is therefore only reused for
+FAILED_PROBE_TTL, after which the next start or reload tests again.
+
+This module has no Home Assistant dependencies.
+"""
+import glob
+import importlib.util
+import json
+import logging
+import os
+import platform
+import time
+from importlib import metadata
+
+_LOGGER = logging.getLogger(__name__)
+
+PROBE_FILE = "energenie.probe"  # in .storage, shared by all config entries
+BOARD_MODEL_PATH = "/proc/device-tree/model"
+SPI_DEVICES = "/dev/spidev*"
+FAILED_PROBE_TTL = 3600  # seconds a failed hardware test is reused
+
+PROBE_OK = "ok"
+PROBE_HARDWARE_FAILED = "hardware_failed"  # libraries present, init() failed
+PROBE_MISSING_GPIO = "missing_rpi_gpio"
+PROBE_MISSING_ENERGENIE = "missing_pyenergenie"
+
+# Library module -> distribution names it may be installed under
+LIBRARIES = {
+    "RPi.GPIO": ("RPi.GPIO",),
+    "energenie": ("pyenergenie", "energenie"),
+}
+
+
+def _library_stamp(module, distributions):
+    """Return the installed version of a library, or None when missing.
+
+    The size and modification time of the module are included because
+    a git install of pyenergenie keeps its version number across updates.
+    """
+    try:
+        spec = importlib.util.find_spec(module)
+    except (ImportError, ValueError):
+        spec = None
+    if spec is None:
+        return None
+    version = None
+    for distribution in distributions:
+        try:
+            version = metadata.version(distribution)
+            break
+        except metadata.PackageNotFoundError:
+            continue
+    stamp = [version]
+    if spec.origin and os.path.exists(spec.origin):
+        stat = os.stat(spec.origin)
+        stamp += [stat.st_size, int(stat.st_mtime)]
+    return stamp
+
+
+def _board_model():
+    """Return the model of the Raspberry Pi, or None on other hosts."""
+    try:
+        with open(BOARD_MODEL_PATH, "rb") as model:
+            return model.read().rstrip(b"\x00").decode("utf-8", "replace").strip() or None
+    except OSError:
+        return None
+
+
+def fingerprint():
+    """Return what a probe result depends on, as JSON serializable data."""
+    return {
+        "python": platform.python_version(),
+        "libraries": {
+            module: _library_stamp(module, distributions)
+            for module, distributions in LIBRARIES.items()
+        },
+        "spi": sorted(glob.glob(SPI_DEVICES)),
+        "board": _board_model(),
+    }
+
+
+def test_hardware():
+    """Import the libraries and cycle the radio once; return a PROBE_ result."""
+    try:
+        import RPi.GPIO  # noqa: F401
+    except ImportError as e:
+        _LOGGER.error("RPi.GPIO library not available: %s", e)
+        return PROBE_MISSING_GPIO
+    _LOGGER.info("RPi.GPIO library found")
+
+    try:
+        import energenie
+    except ImportError as e:
+        _LOGGER.error("pyenergenie library not available: %s", e)
+        return PROBE_MISSING_ENERGENIE
+
+    try:
+        energenie.init()
+        _LOGGER.info("pyenergenie initialization successful")
+        energenie.finished()
+    except Exception as e:
+        _LOGGER.warning("pyenergenie hardware test failed (this may be normal if hardware not connected): %s", e)
+        return PROBE_HARDWARE_FAILED
+    return PROBE_OK
+
+
+def load(path):
+    """Return the stored probe, or None if there is none or it is unreadable."""
+    try:
+        with open(path, encoding="utf-8") as stored:
+            data = json.load(stored)
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        _LOGGER.debug("Ignoring unreadable Energenie probe file %s", path)
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def forget(path):
+    """Delete the stored probe so the next probe tests the hardware."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _expired(stored):
+    """Return True if a stored failed hardware test is too old to reuse.
+
+    Probes stored before tested_at was recorded count as expired.
+    """
+    if stored is None or stored.get("result") != PROBE_HARDWARE_FAILED:
+        return False
+    tested_at = stored.get("tested_at")
+    if not isinstance(tested_at, (int, float)):
+        return True
+    return not 0 <= time.time() - tested_at < FAILED_PROBE_TTL
+
+
+def probe(path, force=False):
+    """Return the probe result, testing the hardware only when needed.
+
+    The stored result is reused when its fingerprint matches the current
+    one, unless force is set or it is a failed hardware test older than
+    FAILED_PROBE_TTL. Otherwise the hardware is tested and the result
+    stored. Blocks; run it in an executor.
+    """
+    current = fingerprint()
+    stored = None if force else load(path)
+    expired = _expired(stored)
+    if stored is not None and not expired and stored.get("fingerprint") == current and "result" in stored:
+        _LOGGER.debug("Reusing Energenie hardware probe from %s: %s", stored.get("tested"), stored["result"])
+        return stored["result"]
+
+    if force:
+        reason = "forced"
+    elif stored is None:
+        reason = "not probed before"
+    elif expired:
+        reason = "last test failed"
+    else:
+        reason = "fingerprint changed"
+    _LOGGER.info("Testing Energenie libraries and hardware (%s)", reason)
+    result = test_hardware()
+    temp_path = f"{path}.tmp"
+    try:
+        with open(temp_path, "w", encoding="utf-8") as stored_file:
+            json.dump({
+                "fingerprint": current,
+                "result": result,
+                "tested": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "tested_at": time.time(),
+            }, stored_file)
+        os.replace(temp_path, path)
+    except OSError as e:
+        _LOGGER.warning("Could not store Energenie hardware probe: %s", e)
+    return result
@@ -0,0 +1,122 @@
+"""On-demand sampling profiler for the Energenie radio and receive paths.
+
+While a profile runs, a sampler thread looks at the stacks of the radio
+thread, which sends frames and drains and decodes received messages, and
+of the event loop, every SAMPLE_INTERVAL seconds. Event loop samples are
+kept when the integration's code is on the stack (dispatch, entity
+updates, logging called from it) and otherwise counted as Home Assistant.
+The result is written in collapsed-stack form, one "frame;frame;... count"
+line per distinct stack, which flamegraph.pl and speedscope read directly.
+
+Nothing is installed when no profile is running, so there is no overhead.
+This module has no Home Assistant dependencies.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+_LOGGER = logging.getLogger(__name__)
+
+PROFILE_FILE = "energenie_profile_{}.collapsed"  # in the config directory
+SAMPLE_INTERVAL = 0.005  # seconds between samples
+MAX_DURATION = 600  # seconds
+RADIO_THREAD_PREFIX = "energenie_radio"
+OTHER_LOOP_WORK = "event_loop;(home assistant)"
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_running = threading.Lock()
+
+
+def _frame_name(frame):
+    """Return the collapsed-stack name of a frame."""
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def _stack(frame, stop_outside_package=False):
+    """Return the frames of a stack, outermost first.
+
+    With stop_outside_package, the stack starts at the outermost frame of
+    this integration; None is returned when the integration is not on it.
+    """
+    frames = []
+    outermost = None
+    while frame is not None:
+        frames.append(frame)
+        if frame.f_code.co_filename.startswith(PACKAGE_DIR):
+            outermost = len(frames)
+        frame = frame.f_back
+    if stop_outside_package:
+        if outermost is None:
+            return None
+        frames = frames[:outermost]
+    return [_frame_name(frame) for frame in reversed(frames)]
+
+
+class SamplingProfiler:
+    """Samples the radio threads and the event loop for a bounded time."""
+
+    def __init__(self, loop_thread_id, interval=SAMPLE_INTERVAL):
+        """Initialize the profiler."""
+        self._loop_thread_id = loop_thread_id
+        self._interval = interval
+        self.samples = Counter()
+        self.sample_count = 0
+
+    def _sample(self, own_id):
+        """Record the current stack of every profiled thread."""
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            if thread_id == self._loop_thread_id:
+                stack = _stack(frame, stop_outside_package=True)
+                key = OTHER_LOOP_WORK if stack is None else ";".join(["event_loop"] + stack)
+            elif names.get(thread_id, "").startswith(RADIO_THREAD_PREFIX):
+                key = ";".join([RADIO_THREAD_PREFIX] + _stack(frame))
+            else:
+                continue
+            self.samples[key] += 1
+        self.sample_count += 1
+
+    def run(self, duration):
+        """Sample for duration seconds; blocks the calling thread."""
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + min(duration, MAX_DURATION)
+        next_sample = time.monotonic()
+        while next_sample < deadline:
+            self._sample(own_id)
+            next_sample += self._interval
+            delay = next_sample - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_sample = time.monotonic()  # Fell behind; do not burst
+
+    def write(self, path):
+        """Write the samples in collapsed-stack form."""
+        with open(path, "w", encoding="utf-8") as profile:
+            for stack, count in self.samples.most_common():
+                profile.write(f"{stack} {count}\n")
+
+
+def profile(loop_thread_id, duration, path):
+    """Profile for duration seconds and write the result to path.
+
+    Blocks the calling thread, which is not sampled. Raises RuntimeError
+    when a profile is already running. Returns the number of samples.
+    """
+    if not _running.acquire(blocking=False):
+        raise RuntimeError("A profile is already running")
+    try:
+        profiler = SamplingProfiler(loop_thread_id)
+        profiler.run(duration)
+        profiler.write(path)
+    finally:
+        _running.release()
+    _LOGGER.info("Wrote Energenie profile of %d samples to %s", profiler.sample_count, path)
+    return profiler.sample_count
@@ -0,0 +1,1129 @@
+"""Shared ENER314-RT radio access for the Energenie integration."""
+import asyncio
+import functools
+import logging
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_track_time_interval
+
+from .bridge import BridgeClient, parse_bridges
+from .duty import MIN_RX_SHARE, DutyStats, ModeScheduler
+from .frames import FrameCache
+from .history import RadioHistory
+from .journal import CommandJournal
+from .openthings import decode_batch
+from .pacing import PacingReport, run_paced
+from .timers import TimerWheel
+from .tracing import current_trace
+from .const import (
+    ALL_DEVICES,
+    CONF_AIRTIME_BUDGET,
+    CONF_BRIDGE_TOKEN,
+    CONF_BRIDGES,
+    CONF_EVENT_MESSAGE_TYPES,
+    CONF_EVENT_SENSOR_IDS,
+    CONF_MESSAGE_EVENTS,
+    CONF_REASSERT_INTERVAL,
+    CONF_USE_LOCAL_RADIO,
+    DEFAULT_AIRTIME_BUDGET,
+    DEFAULT_REASSERT_INTERVAL,
+    EVENT_MESSAGE,
+    ROUTE_LOCAL,
+    SEQUENCE_INTERVAL,
+    SIGNAL_DEVICE_STATE,
+    SIGNAL_RADIO_AVAILABILITY,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+RECEIVE_INTERVAL = timedelta(seconds=5)  # Drain received messages every 5 seconds
+MAX_MESSAGES_PER_POLL = 32  # Upper bound on messages drained in one poll
+
+# Sensors retransmit each report; identical copies inside this window are dropped
+DUPLICATE_WINDOW = timedelta(seconds=3)
+DUPLICATE_CACHE_SIZE = 128  # Recent (sensor ID, fingerprint) pairs remembered
+
+# Gap between the frames of a bulk transmission
+BURST_INTERVAL = 0.05  # seconds
+
+# Jobs of at most this many frames can be sent in the gaps of a running session
+INTERLEAVE_MAX_FRAMES = 1
+
+# Radio watchdog
+RADIO_CALL_TIMEOUT = 15  # seconds before a local radio call counts as hung
+FAILURE_THRESHOLD = 3  # consecutive failures before the local radio is down
+BACKOFF_INITIAL = 2  # seconds before the first re-initialisation attempt
+BACKOFF_MAX = 300  # longest wait between re-initialisation attempts
+
+# How long a bridge that failed is tried only after the healthy routes
+BRIDGE_RETRY_INTERVAL = timedelta(seconds=30)
+
+# Airtime accounting for background re-assertion
+AIRTIME_WINDOW = 60.0  # seconds over which airtime use is measured
+FRAME_AIRTIME = 0.1  # seconds assumed per frame when a route does not report it
+
+
+def message_sensor_id(msg):
+    """Return the sensor ID a received message came from, as a string.
+
+    Handles attribute style messages as well as pyenergenie's OpenThings
+    dict form ({"header": {"sensorid": ...}, "recs": [...]}).
+    """
+    if isinstance(msg, dict):
+        header = msg.get("header", {})
+        sensor_id = header.get("sensorid", msg.get("sensor_id"))
+    else:
+        sensor_id = getattr(msg, "sensor_id", None)
+        if sensor_id is None:
+            sensor_id = getattr(msg, "device_id", None)
+    return None if sensor_id is None else str(sensor_id)
+
+
+def message_records(msg):
+    """Return the readings of a message as {record name: value}."""
+    if isinstance(msg, dict):
+        return {
+            rec["paramname"]: rec.get("value")
+            for rec in msg.get("recs", ()) if rec.get("paramname")
+        }
+    return {
+        name: value for name, value in getattr(msg, "__dict__", {}).items()
+        if not name.startswith("_") and isinstance(value, (bool, int, float, str))
+    }
+
+
+def _resolve(future, result):
+    """Set the result of a future unless it is already done."""
+    if not future.done():
+        future.set_result(result)
+
+
+def _frame_counts(commands):
+    """Return device -> number of frames in a list of (device, on) commands."""
+    counts = {}
+    for device_num, _ in commands:
+        counts[device_num] = counts.get(device_num, 0) + 1
+    return counts
+
+
+def _parse_filter(value):
+    """Parse a comma separated filter option into a set; empty means no filter."""
+    return {item.strip() for item in (value or "").split(",") if item.strip()}
+
+
+def message_fingerprint(msg):
+    """Return a hashable value identifying the content of a message.
+
+    Uses the sequence number when the message carries one, otherwise the
+    payload itself, so retransmitted copies of a report compare equal.
+    """
+    if isinstance(msg, dict):
+        header = msg.get("header", {})
+        if header.get("seqno") is not None:
+            return ("seq", header["seqno"])
+        return tuple(
+            (rec.get("paramid", rec.get("paramname")), rec.get("value"))
+            for rec in msg.get("recs", ())
+        )
+    for attr in ("seqno", "sequence"):
+        seq = getattr(msg, attr, None)
+        if seq is not None:
+            return ("seq", seq)
+    if hasattr(msg, "__dict__"):
+        return repr(sorted(vars(msg).items()))
+    return repr(msg)
+
+
+class DuplicateFilter:
+    """Bounded LRU of recently seen messages used to drop retransmissions."""
+
+    def __init__(self, window=DUPLICATE_WINDOW, max_size=DUPLICATE_CACHE_SIZE):
+        """Initialize the filter."""
+        self._window = window.total_seconds()
+        self._max_size = max_size
+        self._seen = OrderedDict()
+        self.suppressed = 0
+        self.suppressed_by_sensor = {}
+
+    def is_duplicate(self, sensor_id, msg, now=None):
+        """Return True if msg repeats one seen from sensor_id within the window."""
+        if now is None:
+            now = time.monotonic()
+        key = (sensor_id, message_fingerprint(msg))
+        seen_at = self._seen.get(key)
+        if seen_at is not None and now - seen_at <= self._window:
+            self.suppressed += 1
+            self.suppressed_by_sensor[sensor_id] = self.suppressed_by_sensor.get(sensor_id, 0) + 1
+            return True
+
+        self._seen[key] = now
+        self._seen.move_to_end(key)
+        while len(self._seen) > self._max_size:
+            self._seen.popitem(last=False)
+        return False
+
+
+def _interactive_traffic(method):
+    """Count calls of a send method as interactive traffic while they run."""
+
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        self._interactive_in_flight += 1
+        try:
+            return await method(self, *args, **kwargs)
+        finally:
+            self._interactive_in_flight -= 1
+
+    return wrapper
+
+
+class AirtimeMeter:
+    """Transmit time used over a rolling window."""
+
+    def __init__(self, window=AIRTIME_WINDOW):
+        """Initialize the meter."""
+        self._window = window
+        self._sends = deque()  # (monotonic time, seconds on air)
+        self._used = 0.0
+
+    def record(self, seconds, now=None):
+        """Add a transmission that took seconds of airtime."""
+        self._sends.append((now or time.monotonic(), seconds))
+        self._used += seconds
+
+    def share(self, now=None):
+        """Return the fraction of the window spent transmitting."""
+        cutoff = (now or time.monotonic()) - self._window
+        while self._sends and self._sends[0][0] < cutoff:
+            self._used -= self._sends.popleft()[1]
+        return max(self._used, 0.0) / self._window
+
+
+class RadioUnavailableError(Exception):
+    """The radio needed for a command is down."""
+
+
+class Delivery:
+    """What happened to the frames sent to one device."""
+
+    __slots__ = ("device", "sent", "repeats", "route", "queue_wait", "tx_time", "error")
+
+    def __init__(self, device, sent, repeats, route, queue_wait=None, tx_time=None, error=None):
+        """Initialize the delivery."""
+        self.device = device
+        self.sent = sent
+        self.repeats = repeats
+        self.route = route
+        self.queue_wait = queue_wait
+        self.tx_time = tx_time
+        self.error = error
+
+    def as_dict(self):
+        """Return the delivery as a service response item, times in milliseconds."""
+        return {
+            "device": self.device,
+            "sent": self.sent,
+            "repeats": self.repeats,
+            "route": self.route,
+            "queue_wait_ms": None if self.queue_wait is None else round(self.queue_wait * 1000, 1),
+            "tx_time_ms": None if self.tx_time is None else round(self.tx_time * 1000, 1),
+            "error": self.error,
+        }
+
+
+class EnergenieRadio:
+    """Owns the ENER314-RT radios used by a config entry.
+
+    Transmits go to the locally attached board or to a network bridge,
+    following the route configured for each device and failing over to the
+    other routes when one of them is down.
+
+    A watchdog takes the local board down after repeated failures or a
+    call that hangs, re-initialises it with exponential backoff and then
+    replays the interactive commands that arrived while it was down.
+
+    A single poll drains every message the local board has received and
+    hands each one to the listeners registered for its sensor ID, so
+    entities no longer poll the radio themselves. Retransmitted copies of a
+    report are dropped before they reach any listener.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str, config=None) -> None:
+        """Initialize the radio."""
+        self.hass = hass
+        self._entry_id = entry_id
+        self._config = config or {}
+        self._listeners = {}
+        self._unsub_poll = None
+        self.duplicates = DuplicateFilter()
+        # pyenergenie is not thread safe, so every local radio call uses one thread
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="energenie_radio")
+        self._use_local = self._config.get(CONF_USE_LOCAL_RADIO, True)
+        self._bridges = {}
+        for host, port in parse_bridges(self._config.get(CONF_BRIDGES)):
+            client = BridgeClient(host, port, token=self._config.get(CONF_BRIDGE_TOKEN))
+            self._bridges[client.address] = client
+        self._route_down_until = {}
+        self._device_states = {}
+        self.frames = FrameCache()
+        self.tracer = None  # EnergenieTracer when tracing is enabled
+        self.state_signal = SIGNAL_DEVICE_STATE.format(entry_id)
+        self.availability_signal = SIGNAL_RADIO_AVAILABILITY.format(entry_id)
+        self._local_ok = True
+        self._local_failures = 0
+        self._recovery_task = None
+        self._replay = {}  # device_num -> on, sent once the local radio recovers
+        self.journal = None  # CommandJournal once loaded
+        self._journal_flush = None
+        self.airtime = AirtimeMeter()
+        self._interactive_in_flight = 0  # background re-assertion waits for these
+        self._unsub_reassert = None
+        self._reassert_interval = None
+        self._reassert_next = 0  # round-robin position
+        self.reassert_sent = 0
+        self.reassert_skipped = 0
+        self.decode_errors = 0
+        self.timers = TimerWheel(hass)  # sensor timeouts for the whole entry
+        self.history = RadioHistory()
+        self.duty = DutyStats()  # transmit/receive time of local radio sessions
+        self._tx_jobs = []  # (commands, interval, trace, future) waiting for the local board
+        self._tx_drain = None
+        self._tx_interleaved = None  # deque of short jobs while a session runs
+        # Radio thread state: the board stays initialised between calls
+        self._radio_open = False
+        self._receiving = False
+        self._event_filter = None  # (sensor IDs, message types) when events are on
+        self._async_update_event_filter()
+
+    @callback
+    def async_update_config(self, config):
+        """Use a new config for device routes without restarting the radio."""
+        self._config = config
+        self._async_update_event_filter()
+        self.async_start()
+        if self._event_filter is None and not self._listeners:
+            self._stop_polling()
+
+    @callback
+    def async_start(self):
+        """Start the background work the config asks for."""
+        self.async_schedule_reassert()
+        if self._event_filter is not None:
+            self._ensure_polling()
+
+    @callback
+    def _async_update_event_filter(self):
+        """Read the energenie_message event options."""
+        if not self._config.get(CONF_MESSAGE_EVENTS, False):
+            self._event_filter = None
+            return
+        self._event_filter = (
+            _parse_filter(self._config.get(CONF_EVENT_SENSOR_IDS)),
+            {name.upper() for name in _parse_filter(self._config.get(CONF_EVENT_MESSAGE_TYPES))},
+        )
+
+    @callback
+    def async_schedule_reassert(self):
+        """Start, retime or stop idle-time re-assertion to match the config."""
+        interval = self._config.get(CONF_REASSERT_INTERVAL, DEFAULT_REASSERT_INTERVAL)
+        if interval == self._reassert_interval:
+            return
+        if self._unsub_reassert is not None:
+            self._unsub_reassert()
+            self._unsub_reassert = None
+        self._reassert_interval = interval
+        if interval:
+            _LOGGER.info("Re-asserting desired device states, one frame every %ss", interval)
+            self._unsub_reassert = async_track_time_interval(
+                self.hass, self._async_reassert_next, timedelta(seconds=interval)
+            )
+
+    @property
+    def local_available(self):
+        """Return False while the local radio is down."""
+        return self._local_ok
+
+    def _route_healthy(self, route, now=None):
+        """Return True if route is not currently marked down."""
+        if route == ROUTE_LOCAL:
+            return self._local_ok
+        return self._route_down_until.get(route, 0) <= (now or time.monotonic())
+
+    def device_available(self, device_num):
+        """Return True if any route to the device is healthy."""
+        now = time.monotonic()
+        return any(self._route_healthy(route, now) for route in self._routes(device_num))
+
+    @property
+    def device_states(self):
+        """Return the last state sent to each device number."""
+        return self._device_states
+
+    @callback
+    def _async_set_states(self, device_nums, on):
+        """Record the state sent to devices and notify their entities."""
+        for device_num in device_nums:
+            self._device_states[device_num] = on
+        self._async_journal(device_nums, on, sent=True)
+        async_dispatcher_send(self.hass, self.state_signal, list(device_nums), on)
+
+    async def async_load_journal(self, path):
+        """Load the command journal and restore the states known to be sent."""
+        journal = CommandJournal(path)
+        try:
+            await self.hass.async_add_executor_job(journal.load)
+        except Exception as e:
+            _LOGGER.error("Could not read the Energenie command journal: %s", e)
+        self.journal = journal
+        for device_num, (on, sent) in journal.states.items():
+            if sent:
+                self._device_states[device_num] = on
+
+    @callback
+    def _async_journal(self, device_nums, on, sent):
+        """Record desired states in the journal and schedule a write."""
+        if self.journal is None:
+            return
+        for device_num in device_nums:
+            if device_num != ALL_DEVICES:
+                self.journal.record(device_num, on, sent)
+        if self._journal_flush is None and self.journal.has_pending:
+            self._journal_flush = self.hass.async_create_task(self._async_flush_journal())
+
+    async def _async_flush_journal(self):
+        """Write pending journal records from the executor."""
+        try:
+            while self.journal.has_pending:
+                await self.hass.async_add_executor_job(self.journal.flush)
+        except Exception as e:
+            _LOGGER.error("Could not write the Energenie command journal: %s", e)
+        finally:
+            self._journal_flush = None
+
+    async def async_reconcile(self, device_nums):
+        """Re-command devices whose last journalled command was never sent.
+
+        Runs as one low-priority paced batch, normally once Home Assistant
+        has started.
+        """
+        if self.journal is None:
+            return
+        wanted = set(device_nums)
+        commands = [
+            (device_num, on) for device_num, on in sorted(self.journal.unconfirmed().items())
+            if device_num in wanted
+        ]
+        if not commands:
+            return
+        _LOGGER.info("Re-sending the desired state of %d unconfirmed device(s)", len(commands))
+        try:
+            await self.async_send_batch(commands, interval=SEQUENCE_INTERVAL)
+        except Exception as e:
+            _LOGGER.error("Error reconciling device states: %s", e)
+
+    @property
+    def duplicates_suppressed(self):
+        """Return how many duplicate messages have been dropped."""
+        return self.duplicates.suppressed
+
+    @callback
+    def async_add_listener(self, sensor_id, handler):
+        """Call handler(msg) for every message from sensor_id.
+
+        Returns a callable that removes the listener.
+        """
+        key = str(sensor_id)
+        self._listeners.setdefault(key, []).append(handler)
+        self._ensure_polling()
+
+        @callback
+        def remove_listener():
+            handlers = self._listeners.get(key, [])
+            if handler in handlers:
+                handlers.remove(handler)
+            if not handlers:
+                self._listeners.pop(key, None)
+            if not self._listeners and self._event_filter is None:
+                self._stop_polling()
+
+        return remove_listener
+
+    @callback
+    def _ensure_polling(self):
+        """Start the receive poll if it is not already running."""
+        if not self._use_local:
+            return
+        if self._unsub_poll is None:
+            _LOGGER.info("Starting Energenie receive loop")
+            self._unsub_poll = async_track_time_interval(
+                self.hass, self._async_poll, RECEIVE_INTERVAL
+            )
+
+    @callback
+    def _stop_polling(self):
+        """Stop the receive poll."""
+        if self._unsub_poll is not None:
+            _LOGGER.info("Stopping Energenie receive loop")
+            self._unsub_poll()
+            self._unsub_poll = None
+
+    async def async_stop(self):
+        """Stop receiving, drop all listeners and close bridge connections."""
+        self._stop_polling()
+        self.timers.async_stop()
+        if self._unsub_reassert is not None:
+            self._unsub_reassert()
+            self._unsub_reassert = None
+        self._listeners.clear()
+        if self._tx_drain is not None:
+            self._tx_drain.cancel()
+            self._tx_drain = None
+        self._fail_tx_jobs(self._tx_jobs, RadioUnavailableError("Radio stopped"))
+        self._tx_jobs = []
+        if self._tx_interleaved is not None:
+            self._fail_tx_jobs(self._tx_interleaved, RadioUnavailableError("Radio stopped"))
+            self._tx_interleaved = None
+        if self._recovery_task is not None:
+            self._recovery_task.cancel()
+            self._recovery_task = None
+        for client in self._bridges.values():
+            await client.close()
+        if self._journal_flush is not None:
+            await self._journal_flush
+        # Release the board before returning, so a reloaded radio or a
+        # forced probe cannot call init() ahead of this finished()
+        try:
+            await asyncio.wait_for(
+                self.hass.loop.run_in_executor(self._executor, self._release_radio),
+                RADIO_CALL_TIMEOUT,
+            )
+        except asyncio.TimeoutError:
+            _LOGGER.warning(
+                "Energenie radio thread did not release the board within %ss", RADIO_CALL_TIMEOUT
+            )
+        self._executor.shutdown(wait=False)
+        if self.tracer is not None:
+            self.tracer.stop()
+
+    async def _async_run(self, func, *args, timeout=RADIO_CALL_TIMEOUT):
+        """Run a blocking radio call on the radio thread, under the watchdog.
+
+        The timeout counts from when the call starts on the radio thread,
+        so a call queued behind a long pairing or learn sequence is not
+        taken for a hung one.
+        """
+        loop = self.hass.loop
+        started = loop.create_future()
+
+        def run():
+            loop.call_soon_threadsafe(_resolve, started, None)
+            return func(*args)
+
+        future = loop.run_in_executor(self._executor, run)
+        try:
+            await asyncio.wait((started, future), return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        if future.cancelled():
+            # The thread it was queued on hung and has been abandoned
+            raise RadioUnavailableError("Radio call dropped with a hung radio thread")
+        try:
+            result = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self._replace_hung_thread()
+            self._async_local_down("radio call hung for more than %ds" % timeout)
+            raise RadioUnavailableError("Radio call timed out")
+        except Exception as e:
+            self._async_local_failure(e)
+            raise
+        self._local_failures = 0
+        return result
+
+    @callback
+    def _async_local_failure(self, error):
+        """Count a failed local radio call, taking the radio down after several."""
+        self._local_failures += 1
+        if self._local_failures >= FAILURE_THRESHOLD:
+            self._async_local_down(f"{self._local_failures} consecutive failures, last: {error}")
+
+    def _replace_hung_thread(self):
+        """Abandon a radio thread that is stuck in a call and start a fresh one.
+
+        Calls queued behind the stuck one are dropped; their callers get
+        RadioUnavailableError.
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="energenie_radio")
+        self._radio_open = False
+
+    @callback
+    def _async_local_down(self, reason):
+        """Take the local radio down and start recovering it."""
+        if not self._local_ok:
+            return
+        _LOGGER.error("Energenie radio is down (%s), re-initialising in the background", reason)
+        self._local_ok = False
+        async_dispatcher_send(self.hass, self.availability_signal)
+        self._recovery_task = self.hass.async_create_task(self._async_recover())
+
+    def _open_radio(self):
+        """Initialise the board unless it already is (runs on the radio thread).
+
+        The board stays initialised between calls, and receiving after a
+        transmit session, until the radio stops or a call fails.
+        Returns the energenie module.
+        """
+        import energenie
+
+        if not self._radio_open:
+            energenie.init()
+            self._radio_open = True
+            self._receiving = False
+        return energenie
+
+    def _release_radio(self):
+        """Release the board, ignoring errors (runs on the radio thread)."""
+        self._radio_open = False
+        self._receiving = False
+        try:
+            import energenie
+
+            energenie.finished()
+        except Exception as e:
+            _LOGGER.debug("Ignoring error releasing the radio: %s", e)
+
+    def _reinitialise(self):
+        """Reset the local radio (runs on the radio thread)."""
+        self._release_radio()
+        self._open_radio()
+
+    async def _async_recover(self):
+        """Re-initialise the local radio with exponential backoff."""
+        delay = BACKOFF_INITIAL
+        attempt = 0
+        while True:
+            await asyncio.sleep(delay)
+            attempt += 1
+            future = self.hass.loop.run_in_executor(self._executor, self._reinitialise)
+            try:
+                await asyncio.wait_for(future, RADIO_CALL_TIMEOUT)
+                break
+            except asyncio.TimeoutError:
+                self._replace_hung_thread()
+                _LOGGER.warning("Radio re-initialisation attempt %d hung", attempt)
+            except Exception as e:
+                _LOGGER.warning("Radio re-initialisation attempt %d failed: %s", attempt, e)
+            delay = min(delay * 2, BACKOFF_MAX)
+
+        _LOGGER.info("Energenie radio recovered after %d attempt(s)", attempt)
+        self._local_ok = True
+        self._local_failures = 0
+        self._recovery_task = None
+        async_dispatcher_send(self.hass, self.availability_signal)
+        await self._async_replay()
+
+    async def _async_replay(self):
+        """Send the commands queued while the local radio was down."""
+        if not self._replay:
+            return
+        commands = list(self._replay.items())
+        self._replay.clear()
+        _LOGGER.info("Replaying %d command(s) queued while the radio was down", len(commands))
+        try:
+            await self.async_send_batch(commands)
+        except Exception as e:
+            _LOGGER.error("Error replaying queued commands: %s", e)
+
+    def _routes(self, device_num):
+        """Return the routes to try for a device, preferred and healthy first."""
+        preferred = self._config.get(f"device_{device_num}_bridge") or ROUTE_LOCAL
+        routes = [preferred] if preferred == ROUTE_LOCAL or preferred in self._bridges else []
+        routes += [address for address in self._bridges if address not in routes]
+        if self._use_local and ROUTE_LOCAL not in routes:
+            routes.append(ROUTE_LOCAL)
+        if not routes:
+            routes = [ROUTE_LOCAL]
+
+        now = time.monotonic()
+        # Stable sort keeps the configured order within healthy and failed routes
+        return sorted(routes, key=lambda route: not self._route_healthy(route, now))
+
+    def _transmit_local(self, jobs, interleaved):
+        """Send jobs of (device, on) frames from the local board (runs on the radio thread).
+
+        All queued jobs go out in one radio session, each paced interval
+        seconds apart against a deadline clock, while a ModeScheduler
+        listens between frames. Short jobs appended to the interleaved
+        deque while the session runs are sent in the gaps of its paced
+        jobs and their callers resolved straight away. The session stops
+        at the first job that fails. Returns (results, messages, stats):
+        the PacingReport or exception of each job that was started, the
+        messages received meanwhile and the session's DutyStats.
+        """
+        energenie = self._open_radio()
+        raw_radio = getattr(energenie, "radio", None)
+        if not all(
+            callable(getattr(raw_radio, name, None))
+            for name in ("receiver", "is_receive_waiting", "receive_cbp")
+        ):
+            raw_radio = None
+
+        results = []
+        try:
+            direct = self.frames.available
+            if direct:
+                self.frames.prepare_radio()
+
+            def send(device_num, on):
+                if direct:
+                    self.frames.transmit(device_num, on)
+                elif on:
+                    energenie.switch_on(device_num)
+                else:
+                    energenie.switch_off(device_num)
+
+            def run_job(commands, interval, trace):
+                if trace is not None:
+                    trace.mark("tx_start")
+                try:
+                    return run_paced(commands, interval, scheduled_send, sleep=scheduler.sleep)
+                except Exception as e:
+                    return e
+                finally:
+                    scheduler.job_done()
+                    if trace is not None:
+                        trace.mark("tx_end")
+
+            def next_job():
+                try:
+                    commands, interval, trace, future = interleaved.popleft()
+                except IndexError:
+                    return None
+                return lambda: self.hass.loop.call_soon_threadsafe(
+                    self._async_finish_tx_job, future, run_job(commands, interval, trace)
+                )
+
+            scheduler = ModeScheduler(
+                raw_radio, self.frames.prepare_radio if direct else None, next_job=next_job
+            )
+            scheduled_send = scheduler.send(send)
+            self._receiving = False
+            for commands, interval, trace in jobs:
+                result = run_job(commands, interval, trace)
+                results.append(result)
+                if isinstance(result, Exception):
+                    break
+            scheduler.finish()
+            self._receiving = raw_radio is not None
+        except Exception:
+            self._release_radio()
+            raise
+        if results and isinstance(results[-1], Exception):
+            # Start the next session from a fresh init()
+            self._release_radio()
+        return results, self._decode_raw(scheduler.messages), scheduler.stats
+
+    async def _async_transmit_local(self, commands, interval, trace):
+        """Queue frames for the local board and wait until they have been sent.
+
+        Jobs queued while the board is busy are sent together in its next
+        session, except short ones, which go out in the gaps of the
+        running session. Returns the job's PacingReport.
+        """
+        future = self.hass.loop.create_future()
+        job = (commands, interval, trace, future)
+        if self._tx_interleaved is not None and len(commands) <= INTERLEAVE_MAX_FRAMES:
+            self._tx_interleaved.append(job)
+        else:
+            self._tx_jobs.append(job)
+        if self._tx_drain is None:
+            self._tx_drain = self.hass.async_create_task(self._async_drain_tx_jobs())
+        return await future
+
+    @staticmethod
+    def _fail_tx_jobs(jobs, error):
+        """Fail the callers of jobs that will not be sent."""
+        for *_, future in jobs:
+            if not future.done():
+                future.set_exception(error)
+
+    @callback
+    def _async_finish_tx_job(self, future, result):
+        """Hand a job's PacingReport or exception to its caller."""
+        if isinstance(result, Exception):
+            self._async_local_failure(result)
+            if not future.done():
+                future.set_exception(result)
+        elif not future.done():
+            future.set_result(result)
+
+    async def _async_drain_tx_jobs(self):
+        """Send the queued local jobs, one radio session per batch."""
+        jobs = []
+        try:
+            while self._tx_jobs:
+                jobs, self._tx_jobs = self._tx_jobs, []
+                if not self._local_ok:
+                    self._fail_tx_jobs(jobs, RadioUnavailableError("Local radio is down"))
+                    continue
+                airtime = sum(len(commands) * interval for commands, interval, _, _ in jobs)
+                interleaved = self._tx_interleaved = deque()
+                try:
+                    results, messages, stats = await self._async_run(
+                        self._transmit_local,
+                        [(commands, interval, trace) for commands, interval, trace, _ in jobs],
+                        interleaved,
+                        timeout=RADIO_CALL_TIMEOUT + airtime / (1 - MIN_RX_SHARE),
+                    )
+                except Exception as e:
+                    self._fail_tx_jobs(jobs, e)
+                    continue
+                finally:
+                    # Short jobs that found no gap go out in the next session
+                    self._tx_interleaved = None
+                    self._tx_jobs[:0] = interleaved
+
+                self.duty.add(stats)
+                for (*_, future), result in zip(jobs, results):
+                    self._async_finish_tx_job(future, result)
+                # Jobs after a failed one were not started; try them again
+                self._tx_jobs[:0] = jobs[len(results):]
+                for msg in messages:
+                    self._dispatch(msg)
+        except asyncio.CancelledError:
+            self._fail_tx_jobs(jobs, RadioUnavailableError("Radio stopped"))
+            raise
+        finally:
+            self._tx_drain = None
+
+    async def async_warm_frames(self, device_nums):
+        """Encode the frames of the local board's devices ahead of first use."""
+        if not self._use_local:
+            return
+        try:
+            await self._async_run(self.frames.warm, list(device_nums) + [ALL_DEVICES])
+        except Exception as e:
+            _LOGGER.debug("Could not pre-encode frames: %s", e)
+
+    def _mark_route_down(self, route, error):
+        """Try route after the healthy ones for a while."""
+        _LOGGER.warning("Energenie route %s failed: %s", route, error)
+        if route == ROUTE_LOCAL:
+            return  # The watchdog tracks the local radio
+        was_healthy = self._route_healthy(route)
+        self._route_down_until[route] = time.monotonic() + BRIDGE_RETRY_INTERVAL.total_seconds()
+        if was_healthy:
+            async_dispatcher_send(self.hass, self.availability_signal)
+
+    def _mark_route_up(self, route):
+        """Clear a failure mark after a successful send."""
+        if self._route_down_until.pop(route, None) is not None:
+            async_dispatcher_send(self.hass, self.availability_signal)
+
+    async def _async_send_route(self, route, commands, interval=0, deliveries=None):
+        """Send frames through one route, recording the outcome in the history.
+
+        With a deliveries dict, the Delivery of each device is stored in it.
+        Returns the PacingReport of the sequence, or None for a single frame
+        sent through a bridge.
+        """
+        start = time.monotonic()
+        try:
+            report = await self._async_transmit_route(route, commands, interval)
+        except Exception as e:
+            self.history.record_tx(commands, route, f"error: {e}", time.monotonic() - start)
+            if deliveries is not None:
+                for device_num, repeats in _frame_counts(commands).items():
+                    deliveries[device_num] = Delivery(device_num, False, repeats, route, error=str(e))
+            raise
+        elapsed = time.monotonic() - start
+        self.history.record_tx(commands, route, "sent", elapsed)
+        if deliveries is not None:
+            queue_wait = None
+            if report is not None and report.started is not None:
+                queue_wait = max(report.started - start, 0.0)
+            tx_time = report.duration if report is not None else elapsed
+            for device_num, repeats in _frame_counts(commands).items():
+                deliveries[device_num] = Delivery(device_num, True, repeats, route, queue_wait, tx_time)
+        return report
+
+    async def _async_transmit_route(self, route, commands, interval):
+        """Send frames through one route."""
+        trace = current_trace()
+        if trace is not None:
+            trace.mark("enqueue")
+        if route == ROUTE_LOCAL and not self._local_ok:
+            raise RadioUnavailableError("Local radio is down")
+        report = None
+        if route == ROUTE_LOCAL:
+            report = await self._async_transmit_local(commands, interval, trace)
+        else:
+            if trace is not None:
+                trace.mark("tx_start")
+            if len(commands) == 1:
+                await self._bridges[route].switch(*commands[0])
+            else:
+                response = await self._bridges[route].batch(commands, interval)
+                report = PacingReport.from_dict(response.get("pacing"))
+            if trace is not None:
+                trace.mark("tx_end")
+        self._mark_route_up(route)
+        self.airtime.record(report.duration if report is not None else FRAME_AIRTIME * len(commands))
+        return report
+
+    async def _async_reassert_next(self, now=None):
+        """Resend the desired state of the next device, if the radio is idle.
+
+        Gives way to any interactive command in flight and never takes the
+        airtime used in the last minute over the configured budget.
+        """
+        devices = sorted(
+            device_num for device_num in self._device_states
+            if self._config.get(f"device_{device_num}_enabled", False)
+        )
+        if not devices:
+            return
+        budget = self._config.get(CONF_AIRTIME_BUDGET, DEFAULT_AIRTIME_BUDGET) / 100
+        if self._interactive_in_flight or self.airtime.share() + FRAME_AIRTIME / AIRTIME_WINDOW > budget:
+            self.reassert_skipped += 1
+            return
+
+        device_num = devices[self._reassert_next % len(devices)]
+        self._reassert_next = (self._reassert_next + 1) % len(devices)
+        route = self._routes(device_num)[0]
+        if not self._route_healthy(route):
+            self.reassert_skipped += 1
+            return
+        try:
+            await self._async_send_route(route, [(device_num, self._device_states[device_num])])
+            self.reassert_sent += 1
+        except Exception as e:
+            _LOGGER.debug("Could not re-assert device %d: %s", device_num, e)
+
+    @_interactive_traffic
+    async def async_send(self, device_num, on, replay=True, deliveries=None):
+        """Switch a device on or off through the first route that works.
+
+        Returns the route used; raises the last error when every route fails.
+        With replay, a command that failed because the local radio is down
+        is queued and sent once it recovers. With a deliveries dict, the
+        device's Delivery is stored in it.
+        """
+        self._async_journal([device_num], on, sent=False)
+        last_error = None
+        routes = self._routes(device_num)
+        for route in routes:
+            try:
+                await self._async_send_route(route, [(device_num, on)], deliveries=deliveries)
+            except Exception as e:
+                last_error = e
+                self._mark_route_down(route, e)
+                continue
+            self._async_set_states([device_num], on)
+            return route
+
+        if replay and ROUTE_LOCAL in routes and not self._local_ok:
+            self._replay[device_num] = on
+            last_error = RadioUnavailableError(
+                f"Radio is down, device {device_num} will be switched when it recovers"
+            )
+            if deliveries is not None:
+                deliveries[device_num] = Delivery(device_num, False, 0, None, error=str(last_error))
+        raise last_error
+
+    @_interactive_traffic
+    async def async_send_sequence(self, device_num, states, interval, deliveries=None):
+        """Send a regularly paced sequence of on/off frames to one device.
+
+        Used for pairing and learn mode, where some sockets only latch
+        when the frames arrive at exact intervals. The whole sequence goes
+        out in one radio session through the first route that works.
+        Returns the PacingReport of the sequence. With a deliveries dict,
+        the device's Delivery is stored in it.
+        """
+        commands = [(device_num, bool(on)) for on in states]
+        if not commands:
+            return None
+        self._async_journal([device_num], commands[-1][1], sent=False)
+        last_error = None
+        for route in self._routes(device_num):
+            try:
+                report = await self._async_send_route(route, commands, interval, deliveries)
+            except Exception as e:
+                last_error = e
+                self._mark_route_down(route, e)
+                continue
+            self._async_set_states([device_num], commands[-1][1])
+            if report is not None:
+                _LOGGER.info("Paced sequence for device %d via %s: %s", device_num, route, report)
+            return report
+        raise last_error
+
+    async def async_send_bulk(self, device_nums, on, broadcast=False):
+        """Switch several devices to the same state in one scheduled pass.
+
+        With broadcast, devices sharing a route are switched by a single
+        all-devices frame for the house code instead of one frame each.
+        """
+        await self.async_send_batch([(device_num, on) for device_num in device_nums], broadcast)
+
+    @_interactive_traffic
+    async def async_send_batch(self, commands, broadcast=False, interval=BURST_INTERVAL, deliveries=None):
+        """Send (device, on) commands in one scheduled pass per route.
+
+        Frames for each route go out as one burst paced interval seconds
+        apart, offs before ons and in device order; routes run
+        concurrently. Devices whose burst fails are retried one by one with
+        failover. Returns the PacingReports of the bursts that went out;
+        with a deliveries dict, the Delivery of each device is stored in it.
+        """
+        for device_num, on in commands:
+            self._async_journal([device_num], on, sent=False)
+        by_route = {}
+        for device_num, on in sorted(commands, key=lambda command: (command[1], command[0])):
+            by_route.setdefault(self._routes(device_num)[0], []).append((device_num, on))
+
+        async def send_route(route, route_commands):
+            frames = route_commands
+            if broadcast and len({on for _, on in route_commands}) == 1:
+                frames = [(ALL_DEVICES, route_commands[0][1])]
+            try:
+                report = await self._async_send_route(route, frames, interval, deliveries)
+            except Exception as e:
+                self._mark_route_down(route, e)
+                if deliveries is not None:
+                    deliveries.pop(ALL_DEVICES, None)
+                errors = []
+                for device_num, on in route_commands:
+                    try:
+                        await self.async_send(device_num, on, deliveries=deliveries)
+                    except Exception as err:
+                        errors.append(err)
+                if errors:
+                    raise errors[0]
+                return None
+            if deliveries is not None and ALL_DEVICES in deliveries:
+                # One all-devices frame reached every device of the route
+                delivery = deliveries.pop(ALL_DEVICES)
+                for device_num, _ in route_commands:
+                    deliveries[device_num] = Delivery(
+                        device_num, True, delivery.repeats, route, delivery.queue_wait, delivery.tx_time
+                    )
+            for on in (False, True):
+                members = [device_num for device_num, state in route_commands if state == on]
+                if members:
+                    self._async_set_states(members, on)
+            return report
+
+        reports = await asyncio.gather(
+            *(send_route(route, route_commands) for route, route_commands in by_route.items())
+        )
+        return [report for report in reports if report is not None]
+
+    def _receive_messages(self):
+        """Drain pending messages from the board (runs in the executor).
+
+        When the installed pyenergenie exposes raw payloads, the whole
+        burst is drained first and decoded in one batch; otherwise
+        pyenergenie decodes each message as it is received. The board is
+        put in receive mode only if a transmit session did not leave it
+        there.
+        """
+        energenie = self._open_radio()
+        raw_radio = getattr(energenie, "radio", None)
+        raw = all(
+            callable(getattr(raw_radio, name, None))
+            for name in ("receiver", "is_receive_waiting", "receive_cbp")
+        )
+
+        messages = []
+        try:
+            if raw:
+                if not self._receiving:
+                    raw_radio.receiver(fsk=True)
+                    self._receiving = True
+                waiting = raw_radio.is_receive_waiting
+                receive_raw = raw_radio.receive_cbp
+            for _ in range(MAX_MESSAGES_PER_POLL):
+                if raw:
+                    if not waiting():
+                        break
+                    messages.append(receive_raw())
+                    continue
+                msg = energenie.receive()
+                if not msg:
+                    break
+                messages.append(msg)
+        except Exception:
+            self._release_radio()
+            raise
+
+        return self._decode_raw(messages) if raw else messages
+
+    def _decode_raw(self, payloads):
+        """Decode raw payloads in one batch, counting the ones that are invalid."""
+        if not payloads:
+            return []
+        decoded = decode_batch(payloads)
+        messages = [msg for msg in decoded if msg is not None]
+        self.decode_errors += len(decoded) - len(messages)
+        return messages
+
+    async def _async_poll(self, now=None):
+        """Receive pending messages and dispatch them to listeners."""
+        if not self._local_ok or self._tx_drain is not None:
+            # A transmit session is running and listens between its own frames
+            return
+        try:
+            messages = await self._async_run(self._receive_messages)
+        except Exception as e:
+            _LOGGER.error("Error receiving Energenie messages: %s", e)
+            return
+
+        for msg in messages:
+            self._dispatch(msg)
+
+    @callback
+    def _dispatch(self, msg):
+        """Hand a received message to the listeners for its sensor."""
+        sensor_id = message_sensor_id(msg)
+        if sensor_id is None:
+            _LOGGER.debug("Ignoring message without sensor ID: %s", msg)
+            return
+
+        records = message_records(msg)
+        if self.duplicates.is_duplicate(sensor_id, msg):
+            self.history.record_rx(sensor_id, records, "duplicate")
+            return
+
+        handlers = list(self._listeners.get(sensor_id, ()))
+        self.history.record_rx(sensor_id, records, "delivered" if handlers else "no listener")
+        for handler in handlers:
+            try:
+                handler(msg)
+            except Exception as e:
+                _LOGGER.error("Error handling message from %s: %s", sensor_id, e)
+
+        if self._event_filter is not None:
+            self._fire_message_event(sensor_id, msg, records)
+
+    @callback
+    def _fire_message_event(self, sensor_id, msg, records):
+        """Fire energenie_message for a received message that passes the filters."""
+        sensor_ids, message_types = self._event_filter
+        if sensor_ids and sensor_id not in sensor_ids:
+            return
+        # Attribute style messages name their records in lower case
+        if message_types and message_types.isdisjoint(name.upper() for name in records):
+            return
+        data = {"entry_id": self._entry_id, "sensor_id": sensor_id, "records": records}
+        header = msg.get("header", {}) if isinstance(msg, dict) else {}
+        if "productid" in header:
+            data["product_id"] = header["productid"]
+        self.hass.bus.async_fire(EVENT_MESSAGE, data)
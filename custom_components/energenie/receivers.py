@@ -0,0 +1,101 @@
+"""Registry of the MiHome sensors whose reports the integration receives.
+
+Each entry maps an OpenThings product ID to the kind of entity that shows
+the sensor and a decoder compiled once from a table of record names. A
+report is decoded in one pass over its records with a dict lookup per
+record, instead of probing the message for fields it might have. To
+support a new MiHome sensor, add a Receiver here and an entity class for
+its kind. This module has no Home Assistant dependencies.
+"""
+
+PRODUCT_SMART_PLUG_PLUS = 0x02  # MIHO005
+PRODUCT_MOTION = 0x0C  # MIHO032
+PRODUCT_OPEN = 0x0D  # door/window sensors
+
+
+def _on(value):
+    """Return a record value as a bool."""
+    return bool(value)
+
+
+def compile_decoder(fields):
+    """Return a function decoding messages into {field: value}.
+
+    fields are (field, OpenThings record name, convert, attribute names)
+    tuples. Dict form messages are matched on record names; attribute
+    style messages, from older pyenergenie versions, on attribute names.
+    Only the fields present are returned.
+    """
+    by_record = {record: (field, convert) for field, record, convert, _ in fields}
+    by_attribute = [
+        (attribute, field, convert)
+        for field, _, convert, attributes in fields
+        for attribute in attributes
+    ]
+
+    def decode(msg):
+        values = {}
+        if isinstance(msg, dict):
+            for rec in msg.get("recs", ()):
+                entry = by_record.get(rec.get("paramname"))
+                if entry is not None and rec.get("value") is not None:
+                    values[entry[0]] = entry[1](rec["value"])
+            return values
+        for attribute, field, convert in by_attribute:
+            if field not in values:
+                value = getattr(msg, attribute, None)
+                if value is not None:
+                    values[field] = convert(value)
+        return values
+
+    return decode
+
+
+class Receiver:
+    """A MiHome sensor product: its entity kind and report decoder."""
+
+    __slots__ = ("product_id", "models", "kind", "decode")
+
+    def __init__(self, product_id, models, kind, fields):
+        """Initialize the receiver and compile its decoder."""
+        self.product_id = product_id
+        self.models = models
+        self.kind = kind
+        self.decode = compile_decoder(fields)
+
+
+RECEIVERS = {
+    receiver.product_id: receiver
+    for receiver in (
+        Receiver(PRODUCT_SMART_PLUG_PLUS, ("MIHO005",), "power", [
+            ("real_power", "REAL_POWER", float, ("real_power",)),
+            ("reactive_power", "REACTIVE_POWER", float, ("reactive_power",)),
+            ("voltage", "VOLTAGE", float, ("voltage",)),
+            ("frequency", "FREQUENCY", float, ("frequency",)),
+        ]),
+        Receiver(PRODUCT_MOTION, ("MIHO032",), "motion", [
+            ("motion", "MOTION_DETECTOR", _on, ("motion", "switch", "state")),
+        ]),
+        Receiver(PRODUCT_OPEN, ("MIHO012",), "door", [
+            ("open", "DOOR_SENSOR", _on, ("door", "open", "state")),
+        ]),
+    )
+}
+
+RECEIVERS_BY_KIND = {receiver.kind: receiver for receiver in RECEIVERS.values()}
+
+
+def decode_report(msg, default):
+    """Decode a report with the receiver for its product ID.
+
+    Messages that carry no product ID are decoded by default. Returns the
+    receiver used, or None for an unknown product, and the values.
+    """
+    product_id = msg.get("header", {}).get("productid") if isinstance(msg, dict) else None
+    if product_id is None:
+        receiver = default
+    else:
+        receiver = RECEIVERS.get(product_id)
+        if receiver is None:
+            return None, {}
+    return receiver, receiver.decode(msg)
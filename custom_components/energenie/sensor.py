@@ -0,0 +1,380 @@
+"""Sensor platform for Energenie ENER314-RT integration."""
+import logging
+import time
+from datetime import timedelta
+
+from homeassistant.components.sensor import (
+    RestoreSensor,
+    SensorDeviceClass,
+    SensorEntity,
+    SensorStateClass,
+)
+from homeassistant.const import (
+    UnitOfElectricPotential,
+    UnitOfEnergy,
+    UnitOfFrequency,
+    UnitOfPower,
+)
+try:
+    from homeassistant.const import UnitOfReactivePower
+    VOLT_AMPERE_REACTIVE = UnitOfReactivePower.VOLT_AMPERE_REACTIVE
+except ImportError:  # UnitOfReactivePower needs Home Assistant 2024.2 or later
+    from homeassistant.const import POWER_VOLT_AMPERE_REACTIVE as VOLT_AMPERE_REACTIVE
+from homeassistant.core import callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity import EntityCategory
+from homeassistant.helpers.event import async_track_time_interval
+
+from .const import (
+    DOMAIN,
+    CONF_POWER_MONITOR_ENABLED,
+    CONF_POWER_MONITOR_NAME,
+    CONF_POWER_MONITOR_ID,
+    DEFAULT_POWER_MONITOR_NAME,
+    DEFAULT_POWER_MONITOR_ID,
+    DATA_RADIO,
+    DATA_PLATFORMS,
+)
+from .entity import controller_device_info
+from .platform_sync import PlatformEntities
+from .receivers import PRODUCT_SMART_PLUG_PLUS, RECEIVERS, decode_report
+
+_LOGGER = logging.getLogger(__name__)
+
+# Write state at least this often while reports keep arriving
+MAX_WRITE_INTERVAL = timedelta(minutes=1)
+
+# A plug not heard from for this long is unavailable
+REPORT_TIMEOUT = timedelta(minutes=10)
+
+# How often the diagnostic duplicates sensor refreshes
+DUPLICATES_REFRESH_INTERVAL = timedelta(seconds=30)
+
+# Longest gap between two reports that is still integrated into energy
+MAX_INTEGRATION_GAP = 300  # seconds
+
+SMART_PLUG_PLUS = RECEIVERS[PRODUCT_SMART_PLUG_PLUS]
+
+# (key, name suffix, device class, unit, state class, change that forces a write)
+SENSOR_TYPES = [
+    ("real_power", "Power", SensorDeviceClass.POWER, UnitOfPower.WATT,
+     SensorStateClass.MEASUREMENT, 5.0),
+    ("reactive_power", "Reactive Power", SensorDeviceClass.REACTIVE_POWER,
+     VOLT_AMPERE_REACTIVE, SensorStateClass.MEASUREMENT, 5.0),
+    ("voltage", "Voltage", SensorDeviceClass.VOLTAGE, UnitOfElectricPotential.VOLT,
+     SensorStateClass.MEASUREMENT, 1.0),
+    ("frequency", "Frequency", SensorDeviceClass.FREQUENCY, UnitOfFrequency.HERTZ,
+     SensorStateClass.MEASUREMENT, 0.05),
+]
+ENERGY_WRITE_THRESHOLD = 0.01  # kWh
+
+
+async def async_setup_entry(hass, config_entry, async_add_entities):
+    """Set up Energenie sensors from a config entry."""
+    entry_data = hass.data[DOMAIN][config_entry.entry_id]
+    radio = entry_data[DATA_RADIO]
+    duplicates = EnergenieDuplicatesSensor(radio, config_entry.entry_id)
+    monitors = {}
+
+    def build(config):
+        """Return the sensor entities config asks for, by unique ID."""
+        sensors = [duplicates]
+
+        # Smart Plug+ power monitoring sensors
+        wanted_ids = set()
+        if config.get(CONF_POWER_MONITOR_ENABLED, False):
+            name = config.get(CONF_POWER_MONITOR_NAME, DEFAULT_POWER_MONITOR_NAME)
+            sensor_id = config.get(CONF_POWER_MONITOR_ID, DEFAULT_POWER_MONITOR_ID)
+            wanted_ids.add(sensor_id)
+            monitor = monitors.get(sensor_id)
+            if monitor is None:
+                monitor = monitors[sensor_id] = EnergeniePowerMonitor(sensor_id, radio)
+                monitor.unsub = radio.async_add_listener(sensor_id, monitor.async_handle_message)
+
+            sensors.extend(
+                EnergeniePowerSensor(monitor, name, config_entry.entry_id, *sensor_type)
+                for sensor_type in SENSOR_TYPES
+            )
+            sensors.append(EnergenieEnergySensor(monitor, name, config_entry.entry_id))
+
+        # Stop listening for plugs that are no longer configured
+        for sensor_id in [sid for sid in monitors if sid not in wanted_ids]:
+            monitors.pop(sensor_id).async_stop()
+
+        return {sensor.unique_id: sensor for sensor in sensors}
+
+    @callback
+    def stop_monitors():
+        """Stop listening for every plug."""
+        for monitor in monitors.values():
+            monitor.async_stop()
+        monitors.clear()
+
+    config_entry.async_on_unload(stop_monitors)
+
+    platform = PlatformEntities(hass, build, async_add_entities)
+    entry_data[DATA_PLATFORMS]["sensor"] = platform
+    platform.async_apply(config_entry.data)
+
+
+class EnergenieDuplicatesSensor(SensorEntity):
+    """Count of retransmitted messages dropped by the receive path."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_icon = "mdi:content-duplicate"
+
+    _attr_should_poll = False
+
+    def __init__(self, radio, config_entry_id):
+        """Initialize the sensor."""
+        self._radio = radio
+        self._config_entry_id = config_entry_id
+        self._attr_device_info = controller_device_info(config_entry_id)
+        self._attr_name = "Energenie Duplicate Messages Suppressed"
+        self._attr_unique_id = f"energenie_{config_entry_id}_duplicates_suppressed"
+        self._written_value = None
+
+    async def async_added_to_hass(self):
+        """Start refreshing.
+
+        The refresh repeats for the life of the entity, so it runs on its
+        own interval; the entry's timer wheel is kept for sensor deadlines
+        and stops ticking when none are pending.
+        """
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            async_track_time_interval(self.hass, self._refresh, DUPLICATES_REFRESH_INTERVAL)
+        )
+
+    @callback
+    def _refresh(self, now=None):
+        """Write the count if it changed."""
+        if self._radio.duplicates_suppressed != self._written_value:
+            self._written_value = self._radio.duplicates_suppressed
+            self.async_write_ha_state()
+
+    @property
+    def native_value(self):
+        """Return the number of suppressed duplicates."""
+        return self._radio.duplicates_suppressed
+
+    @property
+    def extra_state_attributes(self):
+        """Return the suppressed count per sensor."""
+        return {"by_sensor": dict(self._radio.duplicates.suppressed_by_sensor)}
+
+
+class EnergeniePowerMonitor:
+    """Aggregates the reports of one Smart Plug+ for its sensor entities.
+
+    Every report updates the latest readings and the energy counter; the
+    entities then decide for themselves whether the change is worth a
+    state write.
+    """
+
+    def __init__(self, sensor_id, radio):
+        """Initialize the monitor."""
+        self.sensor_id = sensor_id
+        self.radio = radio
+        self.unsub = None  # Removes the receive listener
+        self.values = {}
+        self.energy_kwh = 0.0
+        self.expired = False  # not heard from within REPORT_TIMEOUT
+        self._last_report = None
+        self._entities = []
+
+    @callback
+    def async_add_entity(self, entity):
+        """Notify entity of every new report."""
+        self._entities.append(entity)
+
+    @callback
+    def async_remove_entity(self, entity):
+        """Stop notifying entity."""
+        if entity in self._entities:
+            self._entities.remove(entity)
+
+    @callback
+    def async_handle_message(self, msg):
+        """Handle a report received from the plug."""
+        receiver, values = decode_report(msg, SMART_PLUG_PLUS)
+        if receiver is not SMART_PLUG_PLUS or not values:
+            _LOGGER.debug("Ignoring message without power readings: %s", msg)
+            return
+
+        now = time.monotonic()
+        if "real_power" in values:
+            self._integrate_energy(values["real_power"], now)
+        self.values.update(values)
+        self.expired = False
+        self.radio.timers.async_schedule(
+            (self.sensor_id, "expire"), REPORT_TIMEOUT.total_seconds(), self._async_expire
+        )
+
+        for entity in list(self._entities):
+            entity.async_report_update()
+
+    @callback
+    def _async_expire(self):
+        """Mark the plug unavailable when its reports stop."""
+        _LOGGER.warning("No report from Smart Plug+ %s for %s", self.sensor_id, REPORT_TIMEOUT)
+        self.expired = True
+        for entity in list(self._entities):
+            entity.async_write_ha_state()
+
+    @callback
+    def async_stop(self):
+        """Stop listening for the plug and drop its timer."""
+        if self.unsub is not None:
+            self.unsub()
+            self.unsub = None
+        self.radio.timers.async_cancel((self.sensor_id, "expire"))
+
+    def _integrate_energy(self, power, now):
+        """Add the energy used since the previous report (trapezoidal rule)."""
+        previous = self.values.get("real_power")
+        if previous is not None and self._last_report is not None:
+            elapsed = min(now - self._last_report, MAX_INTEGRATION_GAP)
+            average_watts = max(0.0, (previous + power) / 2)
+            self.energy_kwh += average_watts * elapsed / 3600000
+        self._last_report = now
+
+
+class EnergeniePowerSensor(SensorEntity):
+    """A single reading of an Energenie Smart Plug+ with rate-limited writes."""
+
+    _attr_should_poll = False
+
+    def __init__(self, monitor, name, config_entry_id, key, suffix,
+                 device_class, unit, state_class, threshold):
+        """Initialize the sensor."""
+        self._monitor = monitor
+        self._config_entry_id = config_entry_id
+        self._attr_device_info = controller_device_info(config_entry_id)
+        self._key = key
+        self._threshold = threshold
+        self._written_value = None
+        self._last_write = None
+        self._attr_name = f"{name} {suffix}"
+        self._attr_unique_id = f"energenie_power_{monitor.sensor_id}_{key}"
+        self._attr_device_class = device_class
+        self._attr_native_unit_of_measurement = unit
+        self._attr_state_class = state_class
+
+    @property
+    def native_value(self):
+        """Return the last written value."""
+        return self._written_value
+
+    @property
+    def extra_state_attributes(self):
+        """Return additional state attributes."""
+        return {"sensor_id": self._monitor.sensor_id}
+
+    @callback
+    def async_update_from(self, other):
+        """Take over the name of a reconfigured sensor."""
+        if other.name != self.name:
+            self._attr_name = other.name
+            if self.hass is not None:
+                self.async_write_ha_state()
+
+    def _current_value(self):
+        """Return the latest value reported by the plug."""
+        return self._monitor.values.get(self._key)
+
+    @property
+    def available(self):
+        """Return False while the radio is down or the plug has gone quiet."""
+        return self._monitor.radio.local_available and not self._monitor.expired
+
+    @property
+    def _write_timer(self):
+        """Return the timer wheel key of the deferred write."""
+        return (self._attr_unique_id, "write")
+
+    async def async_added_to_hass(self):
+        """Start receiving reports when added to hass."""
+        await super().async_added_to_hass()
+        self._monitor.async_add_entity(self)
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass, self._monitor.radio.availability_signal, self.async_write_ha_state
+            )
+        )
+
+    async def async_will_remove_from_hass(self):
+        """Stop receiving reports when removed."""
+        self._monitor.async_remove_entity(self)
+        self._monitor.radio.timers.async_cancel(self._write_timer)
+
+    @callback
+    def async_report_update(self):
+        """Write state on a significant change, otherwise defer the write."""
+        value = self._current_value()
+        if value is None:
+            return
+
+        now = time.monotonic()
+        max_interval = MAX_WRITE_INTERVAL.total_seconds()
+        if (
+            self._written_value is None
+            or abs(value - self._written_value) >= self._threshold
+            or now - self._last_write >= max_interval
+        ):
+            self._write_value(value, now)
+        elif self._write_timer not in self._monitor.radio.timers:
+            delay = max(0.0, max_interval - (now - self._last_write))
+            self._monitor.radio.timers.async_schedule(
+                self._write_timer, delay, self._async_deferred_write
+            )
+
+    @callback
+    def _async_deferred_write(self):
+        """Write the latest value once the maximum interval has passed."""
+        value = self._current_value()
+        if value is not None and value != self._written_value:
+            self._write_value(value, time.monotonic())
+
+    @callback
+    def _write_value(self, value, now):
+        """Publish value as the sensor state."""
+        self._monitor.radio.timers.async_cancel(self._write_timer)
+        self._written_value = value
+        self._last_write = now
+        self.async_write_ha_state()
+
+
+class EnergenieEnergySensor(EnergeniePowerSensor, RestoreSensor):
+    """Cumulative energy used by an Energenie Smart Plug+.
+
+    The counter is integrated from every report, so rate limiting the
+    state writes does not lose any accuracy.
+    """
+
+    def __init__(self, monitor, name, config_entry_id):
+        """Initialize the energy sensor."""
+        super().__init__(
+            monitor, name, config_entry_id, "energy", "Energy",
+            SensorDeviceClass.ENERGY, UnitOfEnergy.KILO_WATT_HOUR,
+            SensorStateClass.TOTAL_INCREASING, ENERGY_WRITE_THRESHOLD,
+        )
+
+    async def async_added_to_hass(self):
+        """Restore the energy counter before receiving reports."""
+        last_data = await self.async_get_last_sensor_data()
+        if last_data is not None and last_data.native_value is not None:
+            try:
+                self._monitor.energy_kwh += float(last_data.native_value)
+                self._written_value = round(self._monitor.energy_kwh, 3)
+                self._last_write = time.monotonic()
+            except (TypeError, ValueError):
+                _LOGGER.debug("Could not restore energy for %s", self._monitor.sensor_id)
+        await super().async_added_to_hass()
+
+    def _current_value(self):
+        """Return the energy counter, once a power reading has arrived."""
+        if "real_power" not in self._monitor.values:
+            return None
+        return round(self._monitor.energy_kwh, 3)
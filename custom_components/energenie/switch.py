@@ -1,10 +1,10 @@
 """Energenie ENER314-RT Switch platform."""
-import asyncio
 import logging
 
 from homeassistant.components.switch import SwitchEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
 from .const import (
@@ -20,7 +20,17 @@ from .const import (
     CONF_DEVICE_3_TYPE,
     CONF_DEVICE_4_NAME,
     CONF_DEVICE_4_TYPE,
+    DATA_RADIO,
+    DATA_PLATFORMS,
+    CONF_GROUP_BROADCAST,
+    MAX_GROUPS,
+    SWITCHABLE_DEVICE_TYPES,
+    SWITCH_DEVICE_TYPES,
+    parse_device_list,
 )
+from .entity import EnergenieDeviceEntity, EnergenieEntity
+from .platform_sync import PlatformEntities
+from .tracing import trace_event, traced
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -30,10 +40,24 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up Energenie switches from a config entry."""
+    entry_data = hass.data[DOMAIN][config_entry.entry_id]
+    radio = entry_data[DATA_RADIO]
+
+    platform = PlatformEntities(
+        hass,
+        lambda config: _build_switches(config, config_entry.entry_id, radio),
+        async_add_entities,
+    )
+    entry_data[DATA_PLATFORMS]["switch"] = platform
+    platform.async_apply(config_entry.data)
+
+
+def _build_switches(config, entry_id: str, radio) -> dict:
+    """Return the switch and group entities config asks for, by unique ID."""
     switches = []
     
     # Get number of devices to check (default to 16 for full range)
-    num_devices = config_entry.data.get("num_devices", 16)
+    num_devices = config.get("num_devices", 16)
     
     # Check all possible device slots up to the configured number
     for i in range(1, num_devices + 1):
@@ -41,89 +65,135 @@ async def async_setup_entry(
         device_type_key = f"device_{i}_type" 
         device_name_key = f"device_{i}_name"
         
-        # Only create switches for enabled devices of switch type
-        if config_entry.data.get(device_enabled_key, False) and config_entry.data.get(device_type_key) == DEVICE_TYPE_SWITCH:
-            device_name = config_entry.data.get(device_name_key, f"Energenie Device {i}")
-            switches.append(EnergenieSwitch(i, device_name, config_entry.entry_id))
+        # Switches, fans and sockets are all plain on/off switches
+        device_type = config.get(device_type_key)
+        if config.get(device_enabled_key, False) and device_type in SWITCH_DEVICE_TYPES:
+            device_name = config.get(device_name_key, f"Energenie Device {i}")
+            switches.append(EnergenieSwitch(i, device_name, entry_id, radio, device_type))
+
+    # Groups can only contain enabled on/off devices
+    switchable = {
+        i for i in range(1, num_devices + 1)
+        if config.get(f"device_{i}_enabled", False)
+        and config.get(f"device_{i}_type") in SWITCHABLE_DEVICE_TYPES
+    }
+    for g in range(1, MAX_GROUPS + 1):
+        if not config.get(f"group_{g}_enabled", False):
+            continue
+        members = [
+            i for i in parse_device_list(config.get(f"group_{g}_devices", ""))
+            if i in switchable
+        ]
+        if not members:
+            _LOGGER.warning("Energenie group %d has no enabled devices, skipping", g)
+            continue
+        group_name = config.get(f"group_{g}_name", f"Energenie Group {g}")
+        # The all-devices frame also switches sockets paired to the house
+        # code that are not configured here, so it is opt-in, and only used
+        # when the group covers every configured device
+        broadcast = config.get(CONF_GROUP_BROADCAST.format(g), False) and set(members) == switchable
+        switches.append(
+            EnergenieGroupSwitch(g, group_name, members, broadcast, entry_id, radio)
+        )
+
+    return {switch.unique_id: switch for switch in switches}
+
+SWITCH_ICONS = {
+    DEVICE_TYPE_FAN: "mdi:fan",
+    DEVICE_TYPE_SOCKET: "mdi:power-socket-uk",
+}
 
-    if switches:
-        async_add_entities(switches, True)
 
-class EnergenieSwitch(SwitchEntity):
+class EnergenieSwitch(EnergenieDeviceEntity, SwitchEntity):
     """Representation of an Energenie Switch."""
 
-    def __init__(self, device_num: int, name: str, entry_id: str) -> None:
+    _platform = "switch"
+
+    def __init__(self, device_num: int, name: str, entry_id: str, radio,
+                 device_type: str = DEVICE_TYPE_SWITCH) -> None:
         """Initialize the switch."""
-        self._device_num = device_num
-        self._name = name
-        self._entry_id = entry_id
-        self._is_on = False
-        self._attr_unique_id = f"{DOMAIN}_{entry_id}_switch_{device_num}"
+        super().__init__(device_num, name, entry_id, radio)
+        self._attr_icon = SWITCH_ICONS.get(device_type, "mdi:toggle-switch")
 
-    @property
-    def name(self) -> str:
-        """Return the name of the switch."""
-        return self._name
+    @callback
+    def async_update_from(self, other: "EnergenieSwitch") -> None:
+        """Take over the name and icon of a reconfigured switch."""
+        if other._attr_icon != self._attr_icon:
+            self._attr_icon = other._attr_icon
+            if self.hass is not None and other._attr_name == self._attr_name:
+                self.async_write_ha_state()
+        super().async_update_from(other)
+
+
+class EnergenieGroupSwitch(EnergenieEntity, SwitchEntity):
+    """A group of Energenie devices switched by one bulk transmission."""
+
+    _attr_icon = "mdi:toggle-switch-variant"
+
+    def __init__(self, group_num: int, name: str, members, broadcast: bool, entry_id: str, radio) -> None:
+        """Initialize the group."""
+        super().__init__(name, f"{DOMAIN}_{entry_id}_group_{group_num}", entry_id, radio)
+        self._group_num = group_num
+        self._members = list(members)
+        self._broadcast = broadcast
+        self._attr_extra_state_attributes = {
+            "devices": self._members,
+            "broadcast": broadcast,
+        }
 
     @property
     def is_on(self) -> bool:
-        """Return true if switch is on."""
-        return self._is_on
+        """Return true if any member is on."""
+        states = self._radio.device_states
+        return any(states.get(device_num, False) for device_num in self._members)
 
-    @property
-    def icon(self) -> str:
-        """Return the icon for the switch."""
-        if self._device_type == DEVICE_TYPE_FAN:
-            return "mdi:fan"
-        elif self._device_type == DEVICE_TYPE_SOCKET:
-            return "mdi:power-socket-uk"
-        else:
-            return "mdi:toggle-switch"
+    @callback
+    def async_update_from(self, other: "EnergenieGroupSwitch") -> None:
+        """Take over the name and members of a reconfigured group."""
+        if (other._members, other._broadcast) != (self._members, self._broadcast):
+            self._members = other._members
+            self._broadcast = other._broadcast
+            self._attr_extra_state_attributes = other._attr_extra_state_attributes
+            if self.hass is not None and other._attr_name == self._attr_name:
+                self.async_write_ha_state()
+        super().async_update_from(other)
 
     @property
-    def device_info(self):
-        """Return device information."""
-        return {
-            "identifiers": {(DOMAIN, self._entry_id)},
-            "name": "Energenie ENER314-RT Controller",
-            "manufacturer": "Energenie",
-            "model": "ENER314-RT",
-        }
+    def available(self) -> bool:
+        """Return False while no member can be reached."""
+        return any(self._radio.device_available(device_num) for device_num in self._members)
 
-    async def async_turn_on(self, **kwargs) -> None:
-        """Turn the switch on."""
-        try:
-            import energenie
-        except ImportError as e:
-            _LOGGER.error("pyenergenie library not available: %s", e)
-            _LOGGER.error("Cannot control device - pyenergenie library is required")
-            return
-            
-        try:
-            energenie.init()
-            energenie.switch_on(self._device_num)
-            energenie.finished()
-            self._is_on = True
+    async def async_added_to_hass(self) -> None:
+        """Follow the states transmitted to the members and radio availability."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass, self._radio.state_signal, self._handle_state_sent
+            )
+        )
+
+    @callback
+    def _handle_state_sent(self, device_nums, on) -> None:
+        """Update the group when a state has been sent to a member."""
+        if any(device_num in self._members for device_num in device_nums):
             self.async_write_ha_state()
-            _LOGGER.info("Turned on %s (device %d)", self._name, self._device_num)
-        except Exception as e:
-            _LOGGER.error("Error turning on %s: %s", self._name, e)
+            trace_event("state_write")
+
+    async def async_turn_on(self, **kwargs) -> None:
+        """Turn every member on."""
+        await self._async_switch(True)
 
     async def async_turn_off(self, **kwargs) -> None:
-        """Turn the switch off."""
-        try:
-            import energenie
-        except ImportError as e:
-            _LOGGER.error("pyenergenie library not available: %s", e)
-            _LOGGER.error("Cannot control device - pyenergenie library is required")
-            return
-            
-        try:
-            energenie.init()
-            energenie.switch_off(self._device_num)
-            energenie.finished()
-            self._is_on = False
-            self.async_write_ha_state()
-            _LOGGER.info("Turned off %s (device %d)", self._name, self._device_num)
-        except Exception as e:
-            _LOGGER.error("Error turning off %s: %s", self._name, e)
\ No newline at end of file
+        """Turn every member off."""
+        await self._async_switch(False)
+
+    async def _async_switch(self, on: bool) -> None:
+        """Switch the members in one bulk transmission."""
+        with traced(self._radio.tracer, f"group.turn_{'on' if on else 'off'}", devices=self._members):
+            try:
+                await self._radio.async_send_bulk(self._members, on, broadcast=self._broadcast)
+                _LOGGER.info(
+                    "Turned %s group %s (devices %s)", "on" if on else "off", self._attr_name, self._members
+                )
+            except Exception as e:
+                _LOGGER.error("Error switching group %s: %s", self._attr_name, e)
@@ -0,0 +1,98 @@
+"""One timer wheel per config entry for sensor timeouts."""
+import logging
+import math
+from datetime import timedelta
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+
+_LOGGER = logging.getLogger(__name__)
+
+TICK = 1.0  # seconds per wheel slot
+SLOTS = 256  # slots per revolution; longer timers wait whole revolutions
+
+
+class TimerWheel:
+    """Hashed timing wheel driven by a single interval callback.
+
+    Motion auto-clear, last-seen expiry and telemetry debounce for every
+    sensor of an entry are scheduled here by key instead of holding a loop
+    timer handle each. Scheduling and cancelling are dict operations on
+    one slot; the tick only looks at the slot that is due, and the
+    interval callback only runs while timers are pending.
+    """
+
+    def __init__(self, hass: HomeAssistant, tick=TICK, slots=SLOTS) -> None:
+        """Initialize the wheel."""
+        self.hass = hass
+        self._tick = tick
+        self._slots = [{} for _ in range(slots)]  # key -> [revolutions left, action]
+        self._slot_of = {}  # key -> slot index
+        self._cursor = 0
+        self._unsub = None
+
+    def __len__(self):
+        """Return the number of pending timers."""
+        return len(self._slot_of)
+
+    def __contains__(self, key):
+        """Return True if a timer is pending for key."""
+        return key in self._slot_of
+
+    @callback
+    def async_schedule(self, key, delay, action):
+        """Call action() after delay seconds, replacing any timer for key."""
+        self.async_cancel(key)
+        ticks = max(1, math.ceil(delay / self._tick))
+        slot = (self._cursor + ticks) % len(self._slots)
+        self._slots[slot][key] = [(ticks - 1) // len(self._slots), action]
+        self._slot_of[key] = slot
+        if self._unsub is None:
+            self._unsub = async_track_time_interval(
+                self.hass, self._async_tick, timedelta(seconds=self._tick)
+            )
+
+    @callback
+    def async_cancel(self, key):
+        """Cancel the timer for key, if any."""
+        slot = self._slot_of.pop(key, None)
+        if slot is not None:
+            del self._slots[slot][key]
+
+    @callback
+    def _async_tick(self, now=None):
+        """Advance one slot and run the timers that are due."""
+        self._cursor = (self._cursor + 1) % len(self._slots)
+        slot = self._slots[self._cursor]
+        due = []
+        for key, entry in list(slot.items()):
+            if entry[0]:
+                entry[0] -= 1
+            else:
+                del slot[key]
+                del self._slot_of[key]
+                due.append(entry[1])
+
+        for action in due:
+            try:
+                action()
+            except Exception as e:
+                _LOGGER.error("Error running Energenie timer: %s", e)
+
+        if not self._slot_of:
+            self._stop()
+
+    @callback
+    def _stop(self):
+        """Stop ticking."""
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+
+    @callback
+    def async_stop(self):
+        """Drop every timer and stop ticking."""
+        for slot in self._slots:
+            slot.clear()
+        self._slot_of.clear()
+        self._stop()
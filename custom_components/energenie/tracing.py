@@ -0,0 +1,198 @@
+"""Opt-in tracing of Energenie commands from service call to state write.
+
+A trace is started when an entity or service handles a command and is
+carried through the radio with a context variable. The radio and entities
+mark events on it (enqueue, TX start, TX end, state write) and the
+finished trace is turned into spans. Spans go to an OpenTelemetry tracer
+when the opentelemetry package is installed, otherwise to a rotating
+JSON-lines file written by a background thread.
+
+With tracing disabled the tracer is None, traced() hands back a shared
+no-op context manager and trace_event() is a single context variable
+lookup.
+"""
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import time
+import uuid
+from contextlib import nullcontext
+
+_LOGGER = logging.getLogger(__name__)
+
+TRACE_FILE = "energenie_trace.jsonl"
+TRACE_FILE_MAX_BYTES = 1024 * 1024
+TRACE_FILE_BACKUPS = 3
+
+# (opening event, closing event, span name) pairs derived from trace events
+SPAN_EVENTS = [
+    ("enqueue", "tx_start", "queue"),
+    ("tx_start", "tx_end", "transmit"),
+    ("tx_end", "state_write", "state_write"),
+]
+
+_NO_TRACE = nullcontext()
+_current_trace = contextvars.ContextVar("energenie_trace", default=None)
+
+
+def current_trace():
+    """Return the trace of the command being handled, if any."""
+    return _current_trace.get()
+
+
+def trace_event(event):
+    """Mark event on the current trace, if tracing is active."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.mark(event)
+
+
+def traced(tracer, name, **attributes):
+    """Return a context manager tracing the enclosed command.
+
+    tracer may be None, in which case nothing is recorded.
+    """
+    if tracer is None:
+        return _NO_TRACE
+    return _TraceScope(tracer, name, attributes)
+
+
+class CommandTrace:
+    """Events recorded while one command travels through the integration."""
+
+    __slots__ = ("trace_id", "name", "attributes", "start_wall_ns", "start", "events", "error")
+
+    def __init__(self, name, attributes):
+        """Start the trace."""
+        self.trace_id = uuid.uuid4().hex
+        self.name = name
+        self.attributes = attributes
+        self.start_wall_ns = time.time_ns()
+        self.start = time.monotonic()
+        self.events = []
+        self.error = None
+
+    def mark(self, event):
+        """Record that event happened now; safe to call from the radio thread."""
+        self.events.append((event, time.monotonic()))
+
+    def spans(self, end):
+        """Return (name, start, end) monotonic spans derived from the events."""
+        spans = [(self.name, self.start, end)]
+        for opening, closing, span_name in SPAN_EVENTS:
+            opened = None
+            for event, at in self.events:
+                if event == opening:
+                    opened = at
+                elif event == closing and opened is not None:
+                    spans.append((span_name, opened, at))
+                    opened = None
+        return spans
+
+
+class _TraceScope:
+    """Context manager that owns the current trace while a command runs."""
+
+    __slots__ = ("_tracer", "_trace", "_token")
+
+    def __init__(self, tracer, name, attributes):
+        """Prepare the scope."""
+        self._tracer = tracer
+        self._trace = CommandTrace(name, attributes)
+        self._token = None
+
+    def __enter__(self):
+        """Make the trace current."""
+        self._token = _current_trace.set(self._trace)
+        return self._trace
+
+    def __exit__(self, exc_type, exc, tb):
+        """Export the trace and restore the previous one."""
+        _current_trace.reset(self._token)
+        if exc is not None:
+            self._trace.error = str(exc)
+        try:
+            self._tracer.export(self._trace, time.monotonic())
+        except Exception as e:
+            _LOGGER.debug("Could not export trace: %s", e)
+        return False
+
+
+class EnergenieTracer:
+    """Exports finished command traces."""
+
+    def __init__(self, path):
+        """Initialize the tracer, writing to path unless OpenTelemetry is installed."""
+        self._otel = None
+        self._listener = None
+        self._file_logger = None
+        try:
+            from opentelemetry import trace as otel_trace
+
+            self._otel = otel_trace.get_tracer("custom_components.energenie")
+            _LOGGER.info("Energenie tracing exports to OpenTelemetry")
+        except ImportError:
+            self._start_file(path)
+            _LOGGER.info("Energenie tracing writes to %s", path)
+
+    def _start_file(self, path):
+        """Write traces to a rotating file from a background thread."""
+        records = queue.SimpleQueue()
+        file_handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=TRACE_FILE_MAX_BYTES, backupCount=TRACE_FILE_BACKUPS
+        )
+        file_handler.setFormatter(logging.Formatter("%(message)s"))
+        self._listener = logging.handlers.QueueListener(records, file_handler)
+        self._listener.start()
+
+        self._file_logger = logging.getLogger(f"{__name__}.{uuid.uuid4().hex}")
+        self._file_logger.propagate = False
+        self._file_logger.setLevel(logging.INFO)
+        self._file_logger.addHandler(logging.handlers.QueueHandler(records))
+
+    def export(self, trace, end):
+        """Export a finished trace."""
+        spans = trace.spans(end)
+        if self._otel is not None:
+            self._export_otel(trace, spans)
+        elif self._file_logger is not None:
+            self._file_logger.info(json.dumps({
+                "trace_id": trace.trace_id,
+                "name": trace.name,
+                "attributes": trace.attributes,
+                "start_ns": trace.start_wall_ns,
+                "error": trace.error,
+                "spans": [
+                    {
+                        "name": name,
+                        "offset_ms": round((start - trace.start) * 1000, 3),
+                        "duration_ms": round((stop - start) * 1000, 3),
+                    }
+                    for name, start, stop in spans
+                ],
+            }))
+
+    def _export_otel(self, trace, spans):
+        """Send the spans to OpenTelemetry, children under the command span."""
+        from opentelemetry import trace as otel_trace
+
+        def wall_ns(at):
+            return trace.start_wall_ns + int((at - trace.start) * 1e9)
+
+        name, start, end = spans[0]
+        root = self._otel.start_span(name, start_time=wall_ns(start), attributes=trace.attributes)
+        context = otel_trace.set_span_in_context(root)
+        for child_name, child_start, child_end in spans[1:]:
+            child = self._otel.start_span(child_name, context=context, start_time=wall_ns(child_start))
+            child.end(end_time=wall_ns(child_end))
+        if trace.error:
+            root.set_attribute("error", trace.error)
+        root.end(end_time=wall_ns(end))
+
+    def stop(self):
+        """Flush and stop the file writer."""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
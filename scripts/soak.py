@@ -0,0 +1,546 @@
+#!/usr/bin/env python3
+"""Soak and stress harness for the Energenie integration with fault injection.
+
+Sets up the integration's switch, binary_sensor and sensor platforms on a
+bare Home Assistant core against a simulated board, and drives their real
+entities for a long time: switch and group entities turned on and off at
+random, bulk batches, pairing and learn sequences, and a flood of
+OpenThings reports from the configured motion, door and Smart Plug+
+sensors and from unknown ones. Meanwhile the board injects radio faults
+(exceptions, hung calls and dropped frames).
+
+At the end it checks that memory did not keep growing, that the number
+of loop timer handles stayed bounded, that the event loop was never held
+up for long, and that the watchdog never took the radio down for a hang
+that was not injected. Once the faults stop, idle-time re-assertion has
+to bring every simulated socket to the state its switch entity shows.
+Once the reports stop, the motion sensor has to clear through the timer
+wheel and the door sensor has to show the last reported state. Run it
+from the repository root in an environment with Home Assistant
+installed:
+
+    python3 scripts/soak.py --duration 3600
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from homeassistant.core import HomeAssistant, callback  # noqa: E402
+from homeassistant.helpers import entity as entity_helper, entity_registry, restore_state  # noqa: E402
+from homeassistant.helpers.entity_platform import EntityPlatform  # noqa: E402
+
+from custom_components.energenie import binary_sensor, sensor, switch  # noqa: E402
+from custom_components.energenie.binary_sensor import MOTION_CLEAR_DELAY  # noqa: E402
+from custom_components.energenie.bridge import SimulatedRadio  # noqa: E402
+from custom_components.energenie.const import (  # noqa: E402
+    CONF_AIRTIME_BUDGET,
+    CONF_DOOR_SENSOR_ENABLED,
+    CONF_DOOR_SENSOR_ID,
+    CONF_DOOR_SENSOR_NAME,
+    CONF_MESSAGE_EVENTS,
+    CONF_MOTION_SENSOR_ENABLED,
+    CONF_MOTION_SENSOR_ID,
+    CONF_MOTION_SENSOR_NAME,
+    CONF_POWER_MONITOR_ENABLED,
+    CONF_POWER_MONITOR_ID,
+    CONF_POWER_MONITOR_NAME,
+    CONF_REASSERT_INTERVAL,
+    CONF_USE_LOCAL_RADIO,
+    DATA_CONFIG,
+    DATA_FORWARDED,
+    DATA_PLATFORMS,
+    DATA_RADIO,
+    DEVICE_TYPE_SWITCH,
+    DOMAIN,
+    EVENT_MESSAGE,
+    SEQUENCE_INTERVAL,
+)
+from custom_components.energenie.openthings import encode  # noqa: E402
+from custom_components.energenie.radio import (  # noqa: E402
+    DUPLICATE_WINDOW,
+    RADIO_CALL_TIMEOUT,
+    RECEIVE_INTERVAL,
+    EnergenieRadio,
+)
+from custom_components.energenie.receivers import (  # noqa: E402
+    PRODUCT_MOTION,
+    PRODUCT_OPEN,
+    PRODUCT_SMART_PLUG_PLUS,
+)
+from custom_components.energenie.switch import EnergenieGroupSwitch, EnergenieSwitch  # noqa: E402
+
+_LOGGER = logging.getLogger(__name__)
+
+ENTRY_ID = "soak"
+FIFO_SIZE = 32  # reports the simulated board holds until they are drained
+LAG_PROBE_INTERVAL = 0.1  # seconds between event loop lag probes
+REASSERT_INTERVAL = 1  # seconds between re-asserted frames while settling
+WARMUP_SHARE = 0.1  # share of the run before the memory baseline is taken
+MOTION_ID = 0x2001
+DOOR_ID = 0x2002
+POWER_ID = 0x2003
+OTHER_SENSOR_BASE = 0x1000  # IDs of sensors that no entity listens to
+GROUP_DEVICES = (1, 2, 3)
+SCAN_INTERVAL = timedelta(seconds=30)  # unused; the entities do not poll
+SEQUENCE_LENGTH = (5, 20)  # seconds of a pairing or learn sequence
+
+
+class FaultyRadio(SimulatedRadio):
+    """Simulated board that receives sensor reports and misbehaves on demand.
+
+    Stands in for the pyenergenie module; it is its own low level radio
+    module too, so the integration drains raw payloads from it.
+    """
+
+    def __init__(self, rng, other_sensors, message_rate, fault_rate, hang_rate, drop_rate, hang):
+        """Initialize the board."""
+        super().__init__()
+        self.radio = self
+        self._rng = rng
+        self._sensors = (
+            [(MOTION_ID, "motion"), (DOOR_ID, "door"), (POWER_ID, "power")]
+            + [(sensor_id, "power") for sensor_id in other_sensors]
+        )
+        self._message_rate = message_rate
+        self.fault_rate = fault_rate
+        self.hang_rate = hang_rate
+        self.drop_rate = drop_rate
+        self._hang = hang
+        self._fifo = deque(maxlen=FIFO_SIZE)
+        self._last_fill = time.monotonic()
+        self._lock = threading.Lock()
+        self.reporting = True
+        self.faults = 0
+        self.hangs = 0
+        self.dropped_frames = 0
+        self.reports_sent = 0
+
+    def faults_off(self):
+        """Stop injecting faults."""
+        self.fault_rate = self.hang_rate = self.drop_rate = 0.0
+
+    def _misbehave(self):
+        """Maybe hang or raise, as a flaky board would."""
+        roll = self._rng.random()
+        if roll < self.hang_rate:
+            self.hangs += 1
+            time.sleep(self._hang)
+            raise OSError("Simulated hang")
+        if roll < self.hang_rate + self.fault_rate:
+            self.faults += 1
+            raise OSError("Simulated SPI error")
+
+    def _switch(self, device_num, on):
+        """Send a frame that may be lost on the way."""
+        self._misbehave()
+        self.frames_sent += 1
+        if self._rng.random() < self.drop_rate:
+            self.dropped_frames += 1
+            return
+        with self._lock:
+            self.states[device_num] = on
+
+    def switch_on(self, device_num):
+        """Send an on frame."""
+        self._switch(device_num, True)
+
+    def switch_off(self, device_num):
+        """Send an off frame."""
+        self._switch(device_num, False)
+
+    def receiver(self, fsk=True):
+        """Enter receive mode."""
+
+    def report(self, sensor_id, kind, value):
+        """Queue one report, twice as sensors send it; the copy is a duplicate."""
+        if kind == "motion":
+            payload = encode(0x04, PRODUCT_MOTION, sensor_id, [("MOTION_DETECTOR", 0x01, value)])
+        elif kind == "door":
+            payload = encode(0x04, PRODUCT_OPEN, sensor_id, [("DOOR_SENSOR", 0x01, value)])
+        else:
+            payload = encode(0x04, PRODUCT_SMART_PLUG_PLUS, sensor_id, [
+                ("SWITCH_STATE", 0x01, 1),
+                ("REAL_POWER", 0x82, value),
+            ], pip=self._rng.getrandbits(16))
+        self._fifo.extend((payload, payload))
+        self.reports_sent += 1
+
+    def _fill(self):
+        """Queue the reports that arrived since the last look."""
+        now = time.monotonic()
+        arrived = int((now - self._last_fill) * self._message_rate)
+        if not arrived:
+            return
+        self._last_fill = now
+        if not self.reporting:
+            return
+        for _ in range(min(arrived, FIFO_SIZE)):
+            sensor_id, kind = self._rng.choice(self._sensors)
+            value = self._rng.randint(0, 3000) if kind == "power" else self._rng.randint(0, 1)
+            self.report(sensor_id, kind, value)
+
+    def is_receive_waiting(self):
+        """Return True if a report is waiting."""
+        self._misbehave()
+        self._fill()
+        return bool(self._fifo)
+
+    def receive_cbp(self):
+        """Return the oldest waiting payload."""
+        return bytearray(self._fifo.popleft())
+
+
+class ConfigEntryStub:
+    """The parts of a config entry the platforms use."""
+
+    def __init__(self, entry_id, data):
+        """Initialize the entry."""
+        self.entry_id = entry_id
+        self.data = data
+        self.options = {}
+        self._on_unload = []
+
+    def async_on_unload(self, func):
+        """Call func when the entry unloads."""
+        self._on_unload.append(func)
+
+    def async_unload(self):
+        """Run the unload callbacks."""
+        while self._on_unload:
+            self._on_unload.pop()()
+
+
+class EntityHarness:
+    """Adds platform entities to a bare Home Assistant core.
+
+    Each platform domain gets a real entity platform, so entities get
+    their entity IDs, registry entries, setup and removal the way they do
+    when Home Assistant forwards a config entry.
+    """
+
+    def __init__(self, hass):
+        """Initialize the harness."""
+        self.hass = hass
+        self._platforms = []
+        self._pending = set()
+
+    def add_entities_for(self, domain):
+        """Return an AddEntitiesCallback for a platform domain."""
+        platform = EntityPlatform(
+            hass=self.hass, logger=_LOGGER, domain=domain, platform_name=DOMAIN,
+            platform=None, scan_interval=SCAN_INTERVAL, entity_namespace=None,
+        )
+        self._platforms.append(platform)
+
+        @callback
+        def async_add_entities(new_entities, update_before_add=False):
+            task = self.hass.async_create_task(
+                platform.async_add_entities(list(new_entities), update_before_add)
+            )
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+        return async_add_entities
+
+    async def async_wait(self):
+        """Wait until every entity added so far is set up."""
+        if self._pending:
+            await asyncio.gather(*self._pending)
+
+    def of_type(self, cls):
+        """Return the entities of a class."""
+        return [
+            entity for platform in self._platforms
+            for entity in platform.entities.values() if isinstance(entity, cls)
+        ]
+
+    async def async_remove_all(self):
+        """Remove every entity, as unloading the entry would."""
+        for platform in self._platforms:
+            await platform.async_reset()
+
+
+async def _probe_lag(stats, stop):
+    """Measure how late the event loop wakes a sleeping task."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(LAG_PROBE_INTERVAL)
+        lag = loop.time() - start - LAG_PROBE_INTERVAL
+        stats["max_lag"] = max(stats["max_lag"], lag)
+        # Cancelled handles stay in the heap until asyncio sweeps them
+        handles = sum(not handle.cancelled() for handle in getattr(loop, "_scheduled", ()))
+        stats["max_handles"] = max(stats["max_handles"], handles)
+
+
+async def _drive_commands(radio, entities, rng, devices, args, stats, stop):
+    """Switch entities at random, with bulk batches and paced sequences."""
+    switches = entities.of_type(EnergenieSwitch)
+    groups = entities.of_type(EnergenieGroupSwitch)
+    pending = set()
+    sequence = None
+
+    def start(call, counter):
+        task = asyncio.ensure_future(call)
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+        task.add_done_callback(lambda done: _count_result(done, stats))
+        stats[counter] += 1
+        return task
+
+    while not stop.is_set():
+        await asyncio.sleep(rng.expovariate(args.command_rate))
+        roll = rng.random()
+        if roll < args.sequence_share and (sequence is None or sequence.done()):
+            # One pairing or learn run at a time, as the services are used
+            device_num = rng.choice(devices)
+            frames = int(rng.uniform(*SEQUENCE_LENGTH) / SEQUENCE_INTERVAL)
+            if rng.random() < 0.5:
+                states = [True, False] * (frames // 2)
+            else:
+                states = [rng.random() < 0.5] * frames
+            sequence = start(radio.async_send_sequence(device_num, states, SEQUENCE_INTERVAL), "sequences")
+        elif roll < args.sequence_share + 0.05:
+            commands = [(device_num, rng.random() < 0.5) for device_num in devices]
+            start(radio.async_send_batch(commands), "batches")
+        elif groups and roll < args.sequence_share + 0.1:
+            group = rng.choice(groups)
+            start(group.async_turn_on() if rng.random() < 0.5 else group.async_turn_off(), "commands")
+        else:
+            entity = rng.choice(switches)
+            start(entity.async_turn_on() if rng.random() < 0.5 else entity.async_turn_off(), "commands")
+    if pending:
+        await asyncio.wait(pending)
+
+
+def _count_result(task, stats):
+    """Count a command that raised."""
+    if not task.cancelled() and task.exception() is not None:
+        stats["command_errors"] += 1
+
+
+async def _async_setup_platforms(hass, entry, radio, entities):
+    """Set up the platforms the way the integration forwards them."""
+    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {
+        DATA_CONFIG: entry.data,
+        DATA_RADIO: radio,
+        DATA_PLATFORMS: {},
+        DATA_FORWARDED: set(),
+    }
+    # What bootstrap sets up before any integration loads
+    setup_entity_sources = getattr(entity_helper, "async_setup", None)
+    if setup_entity_sources is not None:
+        setup_entity_sources(hass)
+    await entity_registry.async_load(hass)
+    load_restore_state = getattr(restore_state, "async_load", None)
+    if load_restore_state is not None:
+        await load_restore_state(hass)
+    for domain, platform in (("switch", switch), ("binary_sensor", binary_sensor), ("sensor", sensor)):
+        await platform.async_setup_entry(hass, entry, entities.add_entities_for(domain))
+    await entities.async_wait()
+
+
+async def run(args):
+    """Run the soak and return a list of failed checks."""
+    rng = random.Random(args.seed)
+    devices = list(range(1, args.devices + 1))
+    other_sensors = [OTHER_SENSOR_BASE + index for index in range(args.sensors)]
+    board = FaultyRadio(
+        rng, other_sensors, args.message_rate, args.fault_rate, args.hang_rate, args.drop_rate,
+        RADIO_CALL_TIMEOUT + 1,
+    )
+    sys.modules["energenie"] = board
+
+    try:
+        hass = HomeAssistant(args.config_dir)
+    except TypeError:  # Versions before the config dir moved to the constructor
+        hass = HomeAssistant()
+        hass.config.config_dir = args.config_dir
+    config = {
+        CONF_USE_LOCAL_RADIO: True,
+        CONF_MESSAGE_EVENTS: True,
+        CONF_REASSERT_INTERVAL: 0,
+        CONF_AIRTIME_BUDGET: 100.0,  # settle as fast as the faults allow
+        "num_devices": args.devices,
+        CONF_MOTION_SENSOR_ENABLED: True,
+        CONF_MOTION_SENSOR_NAME: "Soak Motion",
+        CONF_MOTION_SENSOR_ID: str(MOTION_ID),
+        CONF_DOOR_SENSOR_ENABLED: True,
+        CONF_DOOR_SENSOR_NAME: "Soak Door",
+        CONF_DOOR_SENSOR_ID: str(DOOR_ID),
+        CONF_POWER_MONITOR_ENABLED: True,
+        CONF_POWER_MONITOR_NAME: "Soak Plug",
+        CONF_POWER_MONITOR_ID: str(POWER_ID),
+        "group_1_enabled": True,
+        "group_1_name": "Soak Group",
+        "group_1_devices": ",".join(str(device_num) for device_num in GROUP_DEVICES),
+    }
+    for device_num in devices:
+        config[f"device_{device_num}_enabled"] = True
+        config[f"device_{device_num}_type"] = DEVICE_TYPE_SWITCH
+        config[f"device_{device_num}_name"] = f"Soak Device {device_num}"
+    radio = EnergenieRadio(hass, ENTRY_ID, config)
+
+    # Hangs the watchdog detects, to compare with the hangs injected
+    watchdog_hangs = []
+    local_down = radio._async_local_down
+
+    @callback
+    def async_local_down(reason):
+        if radio.local_available and "hung" in reason:
+            watchdog_hangs.append(reason)
+        local_down(reason)
+
+    radio._async_local_down = async_local_down
+
+    entities = EntityHarness(hass)
+    entry = ConfigEntryStub(ENTRY_ID, config)
+    await _async_setup_platforms(hass, entry, radio, entities)
+    radio.async_start()
+    motion = entities.of_type(binary_sensor.EnergenieMotionSensor)[0]
+    door = entities.of_type(binary_sensor.EnergenieDoorSensor)[0]
+
+    stats = {
+        "commands": 0, "batches": 0, "sequences": 0, "command_errors": 0, "events": 0,
+        "motion_on": 0, "max_lag": 0.0, "max_handles": 0,
+    }
+
+    @callback
+    def on_event(event):
+        stats["events"] += 1
+
+    @callback
+    def on_state_changed(event):
+        new_state = event.data.get("new_state")
+        if event.data.get("entity_id") == motion.entity_id and new_state is not None and new_state.state == "on":
+            stats["motion_on"] += 1
+
+    hass.bus.async_listen(EVENT_MESSAGE, on_event)
+    hass.bus.async_listen("state_changed", on_state_changed)
+
+    tracemalloc.start()
+    stop_probe = asyncio.Event()
+    stop_load = asyncio.Event()
+    probe = asyncio.ensure_future(_probe_lag(stats, stop_probe))
+    driver = asyncio.ensure_future(
+        _drive_commands(radio, entities, rng, devices, args, stats, stop_load)
+    )
+
+    start = time.monotonic()
+    baseline = None
+    while time.monotonic() - start < args.duration:
+        await asyncio.sleep(min(args.report_interval, args.duration))
+        elapsed = time.monotonic() - start
+        memory = tracemalloc.get_traced_memory()[0]
+        if baseline is None and elapsed >= args.duration * WARMUP_SHARE:
+            baseline = memory
+        print(
+            "%6ds  commands %d  batches %d  sequences %d (%d failed)  events %d  motion %d  "
+            "faults %d  hangs %d/%d  dropped %d  memory %.1f MB  handles %d  max lag %.0f ms" % (
+                elapsed, stats["commands"], stats["batches"], stats["sequences"],
+                stats["command_errors"], stats["events"], stats["motion_on"], board.faults,
+                len(watchdog_hangs), board.hangs, board.dropped_frames, memory / 1e6,
+                stats["max_handles"], stats["max_lag"] * 1000,
+            ),
+            flush=True,
+        )
+
+    # Stop the load and the faults, then let re-assertion repair dropped frames
+    stop_load.set()
+    await driver
+    board.faults_off()
+    while not radio.local_available:
+        await asyncio.sleep(1)
+    radio.async_update_config({**config, CONF_REASSERT_INTERVAL: REASSERT_INTERVAL})
+    await asyncio.sleep(REASSERT_INTERVAL * (len(devices) + 2))
+
+    # Stop the reports; one last door report must show and motion must clear
+    board.reporting = False
+    await asyncio.sleep(DUPLICATE_WINDOW.total_seconds())
+    door_open = not door.is_on
+    board.report(DOOR_ID, "door", int(door_open))
+    await asyncio.sleep(MOTION_CLEAR_DELAY + 2 * RECEIVE_INTERVAL.total_seconds())
+
+    end_memory = tracemalloc.get_traced_memory()[0]
+    stop_probe.set()
+    await probe
+    tracemalloc.stop()
+
+    failures = []
+    growth = (end_memory - (baseline or end_memory)) / 1e6
+    if growth > args.max_memory_growth:
+        failures.append("memory grew by %.1f MB (limit %.1f MB)" % (growth, args.max_memory_growth))
+    if stats["max_handles"] > args.max_handles:
+        failures.append("%d loop timer handles (limit %d)" % (stats["max_handles"], args.max_handles))
+    if stats["max_lag"] > args.max_lag:
+        failures.append("event loop lag %.0f ms (limit %.0f ms)" % (stats["max_lag"] * 1000, args.max_lag * 1000))
+    if len(watchdog_hangs) > board.hangs:
+        failures.append("the watchdog saw %d hangs but only %d were injected" % (len(watchdog_hangs), board.hangs))
+    wrong = {
+        entity.entity_id: (board.states.get(entity._device_num, False), entity.is_on)
+        for entity in entities.of_type(EnergenieSwitch)
+        if board.states.get(entity._device_num, False) != entity.is_on
+    }
+    for group in entities.of_type(EnergenieGroupSwitch):
+        actual = any(board.states.get(device_num, False) for device_num in GROUP_DEVICES)
+        if actual != group.is_on:
+            wrong[group.entity_id] = (actual, group.is_on)
+    if wrong:
+        failures.append("entities in the wrong state (actual, shown): %s" % wrong)
+    if not stats["motion_on"]:
+        failures.append("the motion sensor never turned on")
+    if motion.is_on:
+        failures.append("motion did not clear %ds after the last report" % MOTION_CLEAR_DELAY)
+    if door.is_on != door_open:
+        failures.append("the door sensor does not show the last report")
+
+    await entities.async_remove_all()
+    entry.async_unload()
+    await radio.async_stop()
+    await hass.async_stop(force=True)
+    return failures
+
+
+def main():
+    """Run the soak harness."""
+    parser = argparse.ArgumentParser(description="Soak test the Energenie integration with fault injection")
+    parser.add_argument("--duration", type=float, default=3600, help="Seconds of load")
+    parser.add_argument("--devices", type=int, default=16, help="Switched devices")
+    parser.add_argument("--sensors", type=int, default=32, help="Simulated sensors no entity listens to")
+    parser.add_argument("--message-rate", type=float, default=20, help="Sensor reports per second")
+    parser.add_argument("--command-rate", type=float, default=2, help="Commands per second")
+    parser.add_argument("--sequence-share", type=float, default=0.02,
+                        help="Share of commands that start a pairing or learn sequence")
+    parser.add_argument("--fault-rate", type=float, default=0.01, help="Chance a radio call raises")
+    parser.add_argument("--hang-rate", type=float, default=0.0002, help="Chance a radio call hangs")
+    parser.add_argument("--drop-rate", type=float, default=0.02, help="Chance a frame is lost")
+    parser.add_argument("--max-memory-growth", type=float, default=8, help="MB allowed after warm-up")
+    parser.add_argument("--max-handles", type=int, default=64, help="Loop timer handles allowed")
+    parser.add_argument("--max-lag", type=float, default=0.5, help="Event loop lag allowed (seconds)")
+    parser.add_argument("--report-interval", type=float, default=60, help="Seconds between progress lines")
+    parser.add_argument("--config-dir", default=".", help="Home Assistant config directory to use")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Enable debug logging")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+    failures = asyncio.run(run(args))
+    for failure in failures:
+        print("FAIL:", failure)
+    if failures:
+        sys.exit(1)
+    print("PASS")
+
+
+if __name__ == "__main__":
+    main()